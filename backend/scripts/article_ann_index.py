@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+article_ann_index.py
+- Local approximate nearest-neighbour index (IVF-flat) over tn_home_article embeddings, so topic
+  matching no longer needs VEC_COSINE_DISTANCE scans in a vector-capable DB (works on plain MySQL).
+- Files (under ANN_INDEX_DIR, one "generation" at a time so readers never see a half-rewritten index):
+    meta.json               current generation, dim, centroid count
+    vectors.<gen>.f32       append-only float32 rows (normalized), read through np.memmap
+    rows.<gen>.bin          append-only (id, published_at, side, list) records, one per vector row
+    centroids.<gen>.f32     IVF centroids (spherical k-means), absent until enough rows exist
+- The previous generation's files are kept until the next swap, so a reader that loaded the old meta.json
+  can still open them.
+- daily_vectorizer.py appends every embedding it writes (add(), serialized across processes with a
+  file lock so several lease workers on one host can share the index); once the index has grown to twice
+  the size it was trained on, it is compacted (rows past the retention window dropped) and retrained.
+- search() supports filters by side and a published_at window and returns (article id, similarity).
+  The filter is applied before probing: nprobe is widened by the share of rows the filter drops, and
+  when the probed lists hold fewer than k matching rows it falls back to a flat scan of those rows.
+- Usage:
+    python article_ann_index.py --rebuild      # rebuild from all tn_home_article embeddings in the DB
+    python article_ann_index.py --stats
+    python article_ann_index.py --recall       # filtered recall@10 vs brute force on synthetic data
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 동작 (단일 프로세스 사용 가정)
+    fcntl = None
+
+dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", os.path.join(os.path.dirname(__file__), 'ann_index'))
+ANN_TRAIN_MIN_ROWS = int(os.getenv("ANN_TRAIN_MIN_ROWS", "2000"))  # 이보다 적으면 전수 비교(flat)로 검색
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+ANN_KMEANS_ITERATIONS = 10
+ANN_KMEANS_SAMPLE = 50000
+ANN_MIN_RECALL = 0.95  # --recall 합격 기준
+RETENTION_DAYS = int(os.getenv("HOME_ARTICLE_RETENTION_DAYS", "30"))  # home_article_pruner.py와 같은 보존 기간
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "port": int(os.getenv("DB_PORT", 3306)),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_DATABASE"),
+}
+if 'tidbcloud.com' in (DB_CONFIG.get('host') or '') or os.getenv("DB_SSL_ENABLED") == 'true':
+    DB_CONFIG["ssl"] = {"rejectUnauthorized": False}
+
+SIDE_CODES = {'LEFT': 0, 'CENTER': 1, 'RIGHT': 2}
+ROW_DTYPE = np.dtype([('id', '<i8'), ('published', '<i8'), ('side', 'i1'), ('list', '<i4')])
+NO_TIME = np.iinfo(np.int64).min
+
+
+def _epoch(value: Optional[datetime]) -> int:
+    if value is None:
+        return NO_TIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # DB의 published_at은 UTC로 저장됨
+    return int(value.timestamp())
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    vecs = np.asarray(vecs, dtype=np.float32)
+    return vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+
+
+def spherical_kmeans(vecs: np.ndarray, nlist: int, iterations: int = ANN_KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vecs[rng.choice(len(vecs), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = assign_lists(vecs, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vecs)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        # 비어 있는 클러스터는 임의의 벡터로 다시 시작
+        sums[empty] = vecs[rng.choice(len(vecs), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def assign_lists(vecs: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    out = np.empty(len(vecs), dtype=np.int32)
+    for start in range(0, len(vecs), chunk):
+        out[start:start + chunk] = np.argmax(vecs[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+class ArticleAnnIndex:
+    """tn_home_article 임베딩에 대한 IVF-flat 근사 최근접 이웃 인덱스."""
+
+    def __init__(self, directory: str = ANN_INDEX_DIR):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.meta: Dict = {'generation': 0, 'dim': None, 'nlist': 0, 'trained_rows': 0}
+        self.rows = np.zeros(0, dtype=ROW_DTYPE)
+        self.centroids: Optional[np.ndarray] = None
+        self._vectors: Optional[np.memmap] = None
+        self._ids: set = set()
+        self._list_order: Optional[np.ndarray] = None
+        self._list_bounds: Optional[np.ndarray] = None
+
+    # --- 파일 경로 ---
+    def _path(self, kind: str, generation: Optional[int] = None) -> str:
+        generation = self.meta['generation'] if generation is None else generation
+        suffix = 'bin' if kind == 'rows' else 'f32'
+        return os.path.join(self.directory, f"{kind}.{generation}.{suffix}")
+
+    # --- 로드 ---
+    def load(self) -> "ArticleAnnIndex":
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            return self
+        dim = self.meta['dim']
+        rows = np.fromfile(self._path('rows'), dtype=ROW_DTYPE) if os.path.exists(self._path('rows')) else self.rows
+        vector_rows = os.path.getsize(self._path('vectors')) // (dim * 4) if os.path.exists(self._path('vectors')) else 0
+        # 쓰기 도중이면 두 파일 중 짧은 쪽까지만 사용
+        count = min(len(rows), vector_rows)
+        self.rows = rows[:count].copy()
+        self._vectors = np.memmap(self._path('vectors'), dtype='<f4', mode='r', shape=(count, dim)) if count else None
+        self._ids = set(self.rows['id'].tolist())
+        if self.meta['nlist'] and os.path.exists(self._path('centroids')):
+            self.centroids = np.fromfile(self._path('centroids'), dtype='<f4').reshape(self.meta['nlist'], dim)
+        else:
+            # 다른 프로세스가 centroid 없는 세대로 재학습했으면 이전 centroid를 새 행(list == -1)과 섞지 않음
+            self.centroids = None
+        self._build_lists()
+        return self
+
+    def _build_lists(self) -> None:
+        if self.centroids is None or not len(self.rows):
+            self._list_order = self._list_bounds = None
+            return
+        self._list_order = np.argsort(self.rows['list'], kind='stable')
+        self._list_bounds = np.searchsorted(self.rows['list'][self._list_order], np.arange(len(self.centroids) + 1))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _write_meta(self) -> None:
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    # --- 쓰기 ---
+    def add(self, ids: Sequence[int], vecs: np.ndarray, sides: Sequence[Optional[str]],
+            published_at: Sequence[Optional[datetime]]) -> int:
+        """새 임베딩을 인덱스 끝에 추가합니다. 이미 있는 id는 건너뜁니다. 추가된 개수를 반환합니다."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            # 같은 호스트의 여러 vectorizer 워커(--lease)가 동시에 추가해도 파일이 섞이지 않도록 잠금
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.load()  # 다른 프로세스가 추가한 행이나 새 세대를 먼저 반영
+                return self._append(ids, vecs, sides, published_at)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, ids: Sequence[int], vecs: np.ndarray, sides: Sequence[Optional[str]],
+                published_at: Sequence[Optional[datetime]]) -> int:
+        keep = [i for i, article_id in enumerate(ids) if int(article_id) not in self._ids]
+        if not keep:
+            return 0
+        vecs = _normalize(np.asarray(vecs)[keep])
+        if self.meta['dim'] is None:
+            self.meta['dim'] = int(vecs.shape[1])
+            self._write_meta()
+
+        records = np.zeros(len(keep), dtype=ROW_DTYPE)
+        records['id'] = [int(ids[i]) for i in keep]
+        records['published'] = [_epoch(published_at[i]) for i in keep]
+        records['side'] = [SIDE_CODES.get(sides[i], -1) for i in keep]
+        records['list'] = assign_lists(vecs, self.centroids) if self.centroids is not None else -1
+
+        # 이전 쓰기가 중간에 실패했다면 load()가 사용한 행 수 뒤에 남은 꼬리를 잘라 rows와 벡터의 위치를 다시 맞춤
+        # (잠금을 잡은 상태이며, 다른 프로세스의 memmap은 이 길이까지만 매핑하므로 안전)
+        for kind, row_bytes in (('vectors', self.meta['dim'] * 4), ('rows', ROW_DTYPE.itemsize)):
+            expected = len(self.rows) * row_bytes
+            if os.path.exists(self._path(kind)) and os.path.getsize(self._path(kind)) != expected:
+                logging.warning(f"[ANN] Truncating {self._path(kind)} to {len(self.rows)} rows after an incomplete write.")
+                os.truncate(self._path(kind), expected)
+
+        # 벡터를 먼저 기록해야 rows 레코드가 없는 벡터를 가리키지 않음
+        with open(self._path('vectors'), 'ab') as f:
+            f.write(np.ascontiguousarray(vecs, dtype='<f4').tobytes())
+        with open(self._path('rows'), 'ab') as f:
+            f.write(records.tobytes())
+        self.load()
+
+        trained = self.meta['trained_rows']
+        if (not trained and len(self) >= ANN_TRAIN_MIN_ROWS) or (trained and len(self) >= 2 * trained):
+            self.retrain()
+        return len(keep)
+
+    def retrain(self) -> None:
+        """보존 기간이 지난 행을 버리고 centroid를 다시 학습한 새 세대를 만듭니다."""
+        started = time.perf_counter()
+        cutoff = _epoch(datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS))
+        keep = np.flatnonzero((self.rows['published'] == NO_TIME) | (self.rows['published'] >= cutoff))
+        rows = self.rows[keep].copy()
+        dropped = len(self.rows) - len(rows)
+        vecs = np.asarray(self._vectors[keep], dtype=np.float32) if len(keep) else np.zeros((0, self.meta['dim']), np.float32)
+
+        centroids = None
+        if len(rows) >= ANN_TRAIN_MIN_ROWS:
+            nlist = max(16, int(4 * np.sqrt(len(rows))))
+            rng = np.random.default_rng(0)
+            sample = vecs[rng.choice(len(vecs), min(len(vecs), ANN_KMEANS_SAMPLE), replace=False)]
+            centroids = spherical_kmeans(sample, min(nlist, len(sample)))
+            rows['list'] = assign_lists(vecs, centroids)
+        else:
+            rows['list'] = -1
+
+        old_generation = self.meta['generation']
+        generation = old_generation + 1
+        vecs.astype('<f4').tofile(self._path('vectors', generation))
+        rows.tofile(self._path('rows', generation))
+        if centroids is not None:
+            centroids.astype('<f4').tofile(self._path('centroids', generation))
+        self.meta.update({
+            'generation': generation,
+            'nlist': 0 if centroids is None else len(centroids),
+            'trained_rows': len(rows),
+        })
+        self._write_meta()
+        # 직전 세대는 이전 meta를 읽은 reader가 아직 열 수 있으므로 다음 교체 때까지 남겨 두고, 그 이전 세대만 삭제
+        for kind in ('vectors', 'rows', 'centroids'):
+            try:
+                os.remove(self._path(kind, old_generation - 1))
+            except FileNotFoundError:
+                pass
+        self.load()
+        logging.info(f"[ANN] Retrained index: {len(rows)} rows, {self.meta['nlist']} lists "
+                     f"(dropped {dropped} rows past retention) in {time.perf_counter() - started:.2f}s.")
+
+    # --- 검색 ---
+    def search(self, query: np.ndarray, k: int, side: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, min_similarity: Optional[float] = None,
+               nprobe: int = ANN_NPROBE) -> List[Tuple[int, float]]:
+        """query와 가장 가까운 기사 (id, 코사인 유사도)를 유사도 내림차순으로 최대 k개 반환합니다."""
+        if not len(self.rows) or k <= 0:
+            return []
+        query = _normalize(np.asarray(query).reshape(1, -1))[0]
+
+        mask = np.ones(len(self.rows), dtype=bool)
+        if side is not None:
+            mask &= self.rows['side'] == SIDE_CODES.get(side, -2)
+        if since is not None:
+            mask &= self.rows['published'] >= _epoch(since)  # published_at이 없는 행(NO_TIME)도 여기서 제외됨
+        if until is not None:
+            mask &= (self.rows['published'] != NO_TIME) & (self.rows['published'] <= _epoch(until))
+        allowed = int(mask.sum())
+        if not allowed:
+            return []
+
+        candidates = None
+        if self._list_order is not None:
+            # 필터가 남기는 비율만큼 탐색할 list 수를 늘려, 필터 없는 검색과 비슷한 수의 후보를 비교
+            # (예: 한 진영 x 7일/30일이면 nprobe의 약 8.5배)
+            probes = min(len(self.centroids), int(np.ceil(nprobe * len(self.rows) / allowed)))
+            if probes < len(self.centroids):
+                probe = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+                candidates = np.concatenate([self._list_order[self._list_bounds[l]:self._list_bounds[l + 1]] for l in probe])
+                candidates = candidates[mask[candidates]]
+                if len(candidates) < k:
+                    candidates = None  # 탐색한 list에 필터를 통과한 행이 k개도 없으면 전수 비교
+        if candidates is None:
+            candidates = np.flatnonzero(mask)
+        candidates = np.sort(candidates)
+
+        scores = self._vectors[candidates] @ query
+        if min_similarity is not None:
+            keep = scores >= min_similarity
+            candidates, scores = candidates[keep], scores[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return [(int(self.rows['id'][candidates[i]]), float(scores[i])) for i in order]
+
+    # --- 전체 재구축 ---
+    def rebuild_from_db(self, cursor, batch_size: int = 5000) -> int:
+        """DB에 저장된 모든 임베딩으로 인덱스를 처음부터 다시 만듭니다."""
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+        self.meta = {'generation': 0, 'dim': None, 'nlist': 0, 'trained_rows': 0}
+        self.rows = np.zeros(0, dtype=ROW_DTYPE)
+        self.centroids = self._vectors = None
+        self._ids = set()
+        self._build_lists()
+        cursor.execute("SELECT id, side, published_at, embedding FROM tn_home_article WHERE embedding IS NOT NULL ORDER BY id")
+        total = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            vecs = np.array([json.loads(row['embedding']) for row in rows], dtype=np.float32)
+            total += self.add([row['id'] for row in rows], vecs, [row['side'] for row in rows],
+                              [row['published_at'] for row in rows])
+        if len(self) and not self.meta['trained_rows']:
+            self.retrain()
+        return total
+
+    def coverage(self, since: datetime) -> Tuple[int, int]:
+        """(since 이후 발행된 행 수, 가장 큰 기사 id). DB와 비교해 인덱스가 빠짐없이 채워졌는지 확인할 때 사용합니다."""
+        if not len(self.rows):
+            return 0, 0
+        return int((self.rows['published'] >= _epoch(since)).sum()), int(self.rows['id'].max())
+
+    def stats(self) -> Dict:
+        return {
+            'rows': len(self.rows),
+            'dim': self.meta['dim'],
+            'lists': self.meta['nlist'],
+            'trained_rows': self.meta['trained_rows'],
+            'generation': self.meta['generation'],
+        }
+
+
+def recall_check(count: int = 30000, dim: int = 64, queries: int = 200, k: int = 10) -> int:
+    """
+    합성 데이터(군집된 벡터, 30일에 걸친 발행 시각, 세 진영)에서 topic_matcher_db와 같은 필터
+    (진영 하나 + 최근 7일)로 검색한 결과를 전수 비교 결과와 비교해 recall@k를 확인합니다.
+    """
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    centers = _normalize(rng.standard_normal((max(16, count // 200), dim)))
+    vecs = _normalize(centers[rng.integers(len(centers), size=count)] + 0.35 * rng.standard_normal((count, dim)) / np.sqrt(dim) * 4)
+    now = datetime.now(timezone.utc)
+    published = [now - timedelta(seconds=int(s)) for s in rng.integers(0, RETENTION_DAYS * 86400 - 3600, size=count)]
+    sides = [('LEFT', 'CENTER', 'RIGHT')[i] for i in rng.integers(3, size=count)]
+    since = now - timedelta(days=7)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = ArticleAnnIndex(directory)
+        index._append(list(range(count)), vecs, sides, published)
+        if not index.meta['nlist']:
+            index.retrain()
+        allowed_all = {side: (index.rows['side'] == SIDE_CODES[side]) & (index.rows['published'] >= _epoch(since))
+                       for side in SIDE_CODES}
+        recalls, started = [], time.perf_counter()
+        for n in range(queries):
+            side = ('LEFT', 'CENTER', 'RIGHT')[n % 3]
+            query = _normalize(vecs[rng.integers(count)][None] + 0.1 * rng.standard_normal((1, dim)) / np.sqrt(dim))[0]
+            found = {article_id for article_id, _ in index.search(query, k, side=side, since=since)}
+            allowed = np.flatnonzero(allowed_all[side])
+            scores = np.asarray(index._vectors[allowed]) @ query
+            expected = set(index.rows['id'][allowed[np.argsort(-scores)[:k]]].tolist())
+            recalls.append(len(found & expected) / max(1, len(expected)))
+        elapsed = time.perf_counter() - started
+        recall = float(np.mean(recalls))
+        print(f"{count} rows x {dim} dims, {index.meta['nlist']} lists, nprobe {ANN_NPROBE}: filtered recall@{k} {recall:.3f}, "
+              f"{elapsed / queries * 1000:.2f} ms/query")
+    if recall < ANN_MIN_RECALL:
+        print(f"FAILURE: filtered recall@{k} {recall:.3f} is below {ANN_MIN_RECALL}.")
+        return 1
+    print("SUCCESS: filtered ANN search matches the brute-force baseline.")
+    return 0
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Local ANN index over tn_home_article embeddings")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild from all embeddings stored in the DB")
+    parser.add_argument('--stats', action='store_true')
+    parser.add_argument('--recall', action='store_true', help="check filtered recall@10 against brute force on synthetic data")
+    args = parser.parse_args()
+
+    if args.recall:
+        return recall_check()
+
+    index = ArticleAnnIndex().load()
+    if args.rebuild:
+        import pymysql
+
+        cnx = pymysql.connect(**DB_CONFIG)
+        try:
+            # 전체 임베딩을 스트리밍으로 읽기 위해 서버 측 커서 사용
+            cursor = cnx.cursor(pymysql.cursors.SSDictCursor)
+            count = index.rebuild_from_db(cursor)
+            cursor.close()
+        finally:
+            cnx.close()
+        logging.info(f"[ANN] Rebuilt index with {count} embeddings.")
+    print(json.dumps(index.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
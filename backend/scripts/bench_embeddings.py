@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_embeddings.py
+- Embedding throughput benchmark on the fixed Korean news corpus in fixtures/embedding_corpus/.
+- Passages are built the way daily_vectorizer.py builds them ("passage: {title} {description}"), once
+  with the full description and once with only its lead sentence (RSS-length), then truncated per run.
+- Every configuration (backend x threads x batch size x truncation) runs in its own child process, so
+  peak RSS is measured per configuration and thread/backend settings never leak between runs.
+- Reports texts/sec, p50/p99 per-batch latency and peak RSS. --output writes the results as JSON;
+  --baseline compares against an earlier JSON and exits 1 when any configuration regressed by more
+  than --threshold (texts/sec down, p99 latency or peak RSS up).
+- Usage:
+    python bench_embeddings.py --output bench.json
+    python bench_embeddings.py --baseline bench.json --threshold 0.10
+    python bench_embeddings.py --backends torch,onnx --threads 1,4 --batch-sizes 16,32,64 --truncate 512,1024
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import platform
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'embedding_corpus', 'news_ko.jsonl')
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def corpus_sha256() -> str:
+    with open(CORPUS_PATH, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_passages(count: int) -> List[str]:
+    """코퍼스에서 전체 본문/리드 문장 두 종류의 passage를 만들고 count개가 될 때까지 반복합니다."""
+    passages = []
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        for line in f:
+            article = json.loads(line)
+            lead = re.split(r'(?<=다\.)\s', article['description'], maxsplit=1)[0]
+            passages.append(f"passage: {article['title']} {article['description']}")
+            passages.append(f"passage: {article['title']} {lead}")
+    return [passages[i % len(passages)] for i in range(count)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# --- 자식 프로세스: 설정 하나 측정 ---
+def run_config(config: Dict) -> Dict:
+    if config['backend'] == 'torch':
+        import torch
+        torch.set_num_threads(config['threads'])
+    from embedding_utils import get_local_model, length_buckets
+
+    model = get_local_model()
+    texts = [text[:config['truncate']] for text in load_passages(config['texts'])]
+    buckets = length_buckets(texts, config['batch_size'])
+
+    def encode(indices: List[int]) -> None:
+        model.encode([texts[i] for i in indices], batch_size=len(indices), normalize_embeddings=True,
+                     convert_to_numpy=True, show_progress_bar=False)
+
+    encode(buckets[0])  # 예열: 첫 배치의 lazy 초기화 비용은 제외
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(config['rounds']):
+        for indices in buckets:
+            batch_started = time.perf_counter()
+            encode(indices)
+            latencies.append(time.perf_counter() - batch_started)
+    elapsed = time.perf_counter() - started
+
+    return dict(config, **{
+        'seconds': round(elapsed, 4),
+        'texts_per_sec': round(len(texts) * config['rounds'] / elapsed, 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+    })
+
+
+def spawn_config(config: Dict) -> Dict:
+    """설정마다 새 프로세스에서 측정합니다 (백엔드/스레드 환경 변수는 import 전에 정해져야 함)."""
+    env = dict(os.environ,
+               EMBED_BACKEND=config['backend'],
+               ORT_INTRA_OP_THREADS=str(config['threads']),
+               OMP_NUM_THREADS=str(config['threads']),
+               MKL_NUM_THREADS=str(config['threads']),
+               EMBED_SERVICE_URL='',  # 서비스나 캐시가 아니라 모델 자체를 측정
+               EMBED_CACHE='false',
+               LOG_LEVEL='WARNING')
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', json.dumps(config)],
+                             capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not lines:
+        error = (process.stderr.strip().splitlines() or [f"exit code {process.returncode}"])[-1]
+        return dict(config, error=error)
+    return json.loads(lines[-1])
+
+
+# --- 결과 비교 ---
+def result_key(result: Dict) -> tuple:
+    return result['backend'], result['threads'], result['batch_size'], result['truncate']
+
+
+def find_regressions(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    previous = {result_key(r): r for r in baseline.get('results', []) if 'error' not in r}
+    regressions = []
+    for result in report['results']:
+        before = previous.get(result_key(result))
+        if before is None or 'error' in result:
+            continue
+        name = "{0} threads={1} batch={2} truncate={3}".format(*result_key(result))
+        if result['texts_per_sec'] < before['texts_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: texts/sec {before['texts_per_sec']} -> {result['texts_per_sec']}")
+        if result['p99_ms'] > before['p99_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p99 {before['p99_ms']}ms -> {result['p99_ms']}ms")
+        if result.get('peak_rss_mb') and before.get('peak_rss_mb') and result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{name}: peak RSS {before['peak_rss_mb']}MB -> {result['peak_rss_mb']}MB")
+    return regressions
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Embedding throughput benchmark")
+    parser.add_argument('--backends', default='torch', help="comma-separated: torch,onnx")
+    parser.add_argument('--threads', default=','.join(str(n) for n in sorted({1, cpu_count()})))
+    parser.add_argument('--batch-sizes', default='8,16,32,64')
+    parser.add_argument('--truncate', default='512,1024', help="passage truncation lengths in characters")
+    parser.add_argument('--texts', type=int, default=240, help="passages encoded per round")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_config(json.loads(args.run_one))))
+        return 0
+
+    from embedding_utils import MODEL_NAME
+
+    configs = [
+        {'backend': backend, 'threads': threads, 'batch_size': batch_size, 'truncate': truncate,
+         'texts': args.texts, 'rounds': args.rounds}
+        for backend in args.backends.split(',')
+        for threads in int_list(args.threads)
+        for batch_size in int_list(args.batch_sizes)
+        for truncate in int_list(args.truncate)
+    ]
+    report = {
+        'model': MODEL_NAME,
+        'corpus': {'path': os.path.relpath(CORPUS_PATH, os.path.dirname(__file__)), 'sha256': corpus_sha256()},
+        'host': {'cpus': cpu_count(), 'platform': platform.platform(), 'python': platform.python_version()},
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'results': [],
+    }
+
+    print(f"Model {MODEL_NAME}, corpus {CORPUS_PATH}, {len(configs)} configurations")
+    print(f"{'backend':<8}{'threads':>8}{'batch':>7}{'trunc':>7}{'texts/sec':>11}{'p50 ms':>9}{'p99 ms':>9}{'peak MB':>9}")
+    for config in configs:
+        result = spawn_config(config)
+        report['results'].append(result)
+        if 'error' in result:
+            print(f"{config['backend']:<8}{config['threads']:>8}{config['batch_size']:>7}{config['truncate']:>7}  [error] {result['error']}")
+            continue
+        print(f"{result['backend']:<8}{result['threads']:>8}{result['batch_size']:>7}{result['truncate']:>7}"
+              f"{result['texts_per_sec']:>11.1f}{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['peak_rss_mb'] or 0:>9.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('corpus', {}).get('sha256') != report['corpus']['sha256'] or baseline.get('model') != MODEL_NAME:
+            print("WARNING: baseline was recorded with a different corpus or model; comparing anyway.")
+        regressions = find_regressions(report, baseline, args.threshold)
+        if regressions:
+            print(f"FAILURE: {len(regressions)} regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"SUCCESS: no regressions beyond {args.threshold:.0%} against {args.baseline}.")
+
+    if all('error' in result for result in report['results']):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
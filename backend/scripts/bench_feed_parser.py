@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_feed_parser.py
+- Compares fast_rss.parse_rss against feedparser on the feed fixtures in fixtures/feeds/.
+- Checks that both parsers agree on the fields rss_collector.py uses, then reports
+  per-feed parse time and throughput for each parser.
+- Usage:
+    python bench_feed_parser.py              # benchmark the checked-in fixtures
+    python bench_feed_parser.py --record     # re-record fixtures from the live feeds in rss_collector.FEEDS
+    python bench_feed_parser.py --rounds 50
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Callable, List
+
+import feedparser
+
+from fast_rss import parse_rss, entry_fields
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'feeds')
+
+
+def record_fixtures() -> None:
+    """rss_collector.FEEDS에서 언론사별 첫 번째 피드를 내려받아 fixture로 저장합니다."""
+    import requests
+    from urllib.parse import urlparse
+    from rss_collector import FEEDS, USER_AGENT
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    seen = set()
+    for feed in FEEDS:
+        if feed['source_domain'] in seen:
+            continue
+        seen.add(feed['source_domain'])
+        name = f"{feed['source_domain'].split('.')[0]}_{urlparse(feed['url']).path.strip('/').replace('/', '_') or 'feed'}.xml"
+        try:
+            response = requests.get(feed['url'], headers={'User-Agent': USER_AGENT}, timeout=15)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"  [skip] {feed['source']} {feed['url']}: {e}")
+            continue
+        with open(os.path.join(FIXTURE_DIR, name), 'wb') as f:
+            f.write(response.content)
+        print(f"  recorded {name} ({len(response.content)} bytes)")
+
+
+def time_parser(parse: Callable[[bytes], List], body: bytes, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        parse(body)
+    return (time.perf_counter() - started) / rounds
+
+
+def feedparser_entries(body: bytes) -> List:
+    # rss_collector.py의 fallback 경로와 같은 방식으로 호출
+    return feedparser.parse(body.decode('utf-8', errors='replace')).entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="fast_rss vs feedparser benchmark")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--record', action='store_true', help="re-record fixtures from the live feeds first")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+
+    fixtures = sorted(f for f in os.listdir(FIXTURE_DIR) if f.endswith('.xml'))
+    if not fixtures:
+        print(f"No fixtures found in {FIXTURE_DIR}")
+        return 1
+
+    mismatches = 0
+    total_fast = total_slow = 0.0
+    total_bytes = 0
+    print(f"{'fixture':<28}{'items':>6}{'fast_rss ms':>13}{'feedparser ms':>15}{'speedup':>9}")
+    for name in fixtures:
+        with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+            body = f.read()
+
+        fast = parse_rss(body)
+        slow = feedparser_entries(body)
+        if fast is None:
+            print(f"{name:<28}{len(slow):>6}  (not RSS 2.0 / unsupported; feedparser fallback)")
+            continue
+        for index, (a, b) in enumerate(zip(fast, slow)):
+            if entry_fields(a) != entry_fields(b):
+                mismatches += 1
+                print(f"  [mismatch] {name} item {index}:\n    fast_rss:   {entry_fields(a)}\n    feedparser: {entry_fields(b)}")
+        if len(fast) != len(slow):
+            mismatches += 1
+            print(f"  [mismatch] {name}: {len(fast)} items vs {len(slow)}")
+
+        fast_seconds = time_parser(parse_rss, body, args.rounds)
+        slow_seconds = time_parser(feedparser_entries, body, args.rounds)
+        total_fast += fast_seconds
+        total_slow += slow_seconds
+        total_bytes += len(body)
+        print(f"{name:<28}{len(fast):>6}{fast_seconds * 1000:>13.2f}{slow_seconds * 1000:>15.2f}{slow_seconds / fast_seconds:>8.1f}x")
+
+    if total_fast:
+        mb = total_bytes / (1024 * 1024)
+        print(f"\nThroughput: fast_rss {mb / total_fast:.1f} MB/s, feedparser {mb / total_slow:.1f} MB/s "
+              f"({total_slow / total_fast:.1f}x)")
+    if mismatches:
+        print(f"FAILURE: {mismatches} field mismatches between parsers.")
+        return 1
+    print("SUCCESS: fast_rss matches feedparser on all fixtures.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
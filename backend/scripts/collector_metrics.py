@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+collector_metrics.py
+- Structured metrics for a single rss_collector.py run.
+- Per feed: fetch latency, bytes, HTTP status, entries parsed, items kept and page scrapes.
+- Per stage: wall time (fetch, parse and enrich are summed over feeds that run concurrently).
+- Written as a Prometheus textfile (node_exporter textfile collector) and appended to a JSONL history.
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Tuple
+
+PREFIX = "rss_collector"
+
+
+@dataclass
+class FeedMetrics:
+    source: str
+    url: str
+    status: int = 0            # 마지막 HTTP 상태 코드 (요청 실패 시 0)
+    fetch_seconds: float = 0.0
+    bytes: int = 0
+    parse_seconds: float = 0.0
+    enrich_seconds: float = 0.0
+    entries: int = 0           # 피드에서 파싱된 항목 수
+    kept: int = 0              # 정제 후 남은 새 기사 수
+    scrapes: int = 0           # 기사 페이지 요청 수
+    scrape_bytes: int = 0
+    unchanged: bool = False    # 304 또는 본문 해시 일치로 파싱을 건너뜀
+    fast_parsed: bool = False  # fast_rss로 파싱됨 (False면 feedparser 사용)
+    failed: bool = False
+
+
+class CollectorMetrics:
+    """한 번의 수집 실행 동안 피드별/단계별 지표를 모읍니다."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.feeds: Dict[str, FeedMetrics] = {}
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def feed(self, feed_info: Dict[str, Any]) -> FeedMetrics:
+        metrics = self.feeds.get(feed_info['url'])
+        if metrics is None:
+            metrics = FeedMetrics(source=feed_info['source'], url=feed_info['url'])
+            self.feeds[feed_info['url']] = metrics
+        return metrics
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started)
+
+    def set_counter(self, name: str, value: int) -> None:
+        self.counters[name] = value
+
+    def finalize(self) -> None:
+        """피드별 fetch/parse/enrich 시간을 단계별 합계로 반영합니다."""
+        for name in ('fetch', 'parse', 'enrich'):
+            self.stages[name] = sum(getattr(m, f"{name}_seconds") for m in self.feeds.values())
+
+    # --- 출력 ---
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': time.time() - self.started_at,
+            'stages': self.stages,
+            'counters': self.counters,
+            'feeds': [asdict(m) for m in self.feeds.values()],
+        }
+
+    def append_history(self, path: str) -> None:
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.to_record(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.warning(f"[Metrics] Failed to append history to {path}: {e}")
+
+    def write_prometheus(self, path: str) -> None:
+        lines: List[str] = []
+
+        def metric(name: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> None:
+            full_name = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        feeds = list(self.feeds.values())
+
+        def per_feed(attr: str) -> List[Tuple[Dict[str, str], float]]:
+            return [({'source': m.source, 'feed': m.url}, float(getattr(m, attr))) for m in feeds]
+
+        metric("last_run_timestamp_seconds", "Unix time the last collection run started.", [({}, self.started_at)])
+        metric("run_duration_seconds", "Wall time of the last collection run.", [({}, time.time() - self.started_at)])
+        metric("stage_seconds", "Time spent per stage; fetch/parse/enrich are summed over concurrent feeds.",
+               [({'stage': name}, seconds) for name, seconds in sorted(self.stages.items())])
+        metric("run_count", "Per-run counters.", [({'name': name}, float(value)) for name, value in sorted(self.counters.items())])
+        metric("feed_fetch_seconds", "Feed download latency.", per_feed('fetch_seconds'))
+        metric("feed_bytes", "Feed response size in bytes.", per_feed('bytes'))
+        metric("feed_http_status", "Last HTTP status of the feed request (0 if the request failed).", per_feed('status'))
+        metric("feed_entries", "Entries parsed from the feed.", per_feed('entries'))
+        metric("feed_items_kept", "New articles kept from the feed after filtering.", per_feed('kept'))
+        metric("feed_scrapes", "Article page requests made for the feed.", per_feed('scrapes'))
+        metric("feed_scrape_bytes", "Bytes received from article page requests for the feed.", per_feed('scrape_bytes'))
+        metric("feed_unchanged", "1 if the feed was skipped as unchanged.", per_feed('unchanged'))
+        metric("feed_fast_parsed", "1 if the feed was parsed by fast_rss instead of feedparser.", per_feed('fast_parsed'))
+        metric("feed_failed", "1 if the feed failed.", per_feed('failed'))
+
+        # textfile collector가 쓰는 도중의 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"[Metrics] Failed to write Prometheus textfile {path}: {e}")
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 continuous_vectorizer.py
-로컬 PC에서 계속 실행되면서 10분마다 기사 수집 + 벡터 인덱싱 파이프라인을 수행합니다.
+로컬 PC에서 계속 실행되면서 기사 수집 + 벡터 인덱싱 파이프라인을 수행합니다.
+피드마다 적응형 주기(feed_scheduler.py)를 가지며, 폴링할 차례인 피드가 생길 때마다 해당 피드만 수집합니다.
+임베딩 서비스(embedding_server.py)가 떠 있지 않으면 자식 프로세스로 띄워 모델을 사이클 사이에도 메모리에 유지합니다.
 """
 import time
 import logging
@@ -9,22 +11,52 @@ import subprocess
 import sys
 import os
 
+import requests
+
+from feed_scheduler import FeedScheduler
+from embedding_utils import EMBED_SERVICE_URL
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
-INTERVAL_SECONDS = 15 * 60  # 15분
+INTERVAL_SECONDS = 15 * 60  # 15분 (다음 사이클까지 최대 대기 시간)
+MIN_SLEEP_SECONDS = 30
+EMBED_SERVER_AUTOSTART = os.getenv("EMBED_SERVER_AUTOSTART", "true").lower() == 'true'
+EMBED_SERVER_STARTUP_TIMEOUT = 180  # 모델 로드까지 기다리는 최대 시간(초)
+
+def embedding_server_healthy():
+    try:
+        return requests.get(f"{EMBED_SERVICE_URL}/health", timeout=2).ok
+    except requests.RequestException:
+        return False
+
+def start_embedding_server():
+    """임베딩 서비스가 없으면 embedding_server.py를 자식 프로세스로 실행하고, 준비될 때까지 기다림"""
+    if not EMBED_SERVICE_URL or not EMBED_SERVER_AUTOSTART or embedding_server_healthy():
+        return None
+    script_path = os.path.join(os.path.dirname(__file__), "embedding_server.py")
+    process = subprocess.Popen([sys.executable, script_path])
+    deadline = time.time() + EMBED_SERVER_STARTUP_TIMEOUT
+    while time.time() < deadline and process.poll() is None:
+        if embedding_server_healthy():
+            logging.info(f"Embedding server started (pid {process.pid}) at {EMBED_SERVICE_URL}")
+            return process
+        time.sleep(2)
+    logging.warning("Embedding server did not become ready; scripts will load the model in-process.")
+    return process
 
 def run_pipeline():
     """run_pipeline.py를 서브프로세스로 실행"""
     script_path = os.path.join(os.path.dirname(__file__), "run_pipeline.py")
-    result = subprocess.run([sys.executable, script_path])
+    result = subprocess.run([sys.executable, script_path, "--due-only"])
     return result.returncode == 0
 
 if __name__ == "__main__":
     logging.info("=== Continuous Pipeline Runner Started ===")
-    logging.info(f"Will run collection + embedding every {INTERVAL_SECONDS // 60} minutes")
+    logging.info(f"Will run collection + embedding for due feeds (at most {INTERVAL_SECONDS // 60} minutes apart)")
+    embedding_server = start_embedding_server()
     
     while True:
         try:
@@ -35,12 +67,17 @@ if __name__ == "__main__":
             else:
                 logging.warning("⚠️ Pipeline finished with errors")
             
-            logging.info(f"--- Sleeping for {INTERVAL_SECONDS // 60} minutes ---")
-            time.sleep(INTERVAL_SECONDS)
+            sleep_seconds = min(INTERVAL_SECONDS, max(MIN_SLEEP_SECONDS, FeedScheduler().load().seconds_until_next_due()))
+            logging.info(f"--- Sleeping for {sleep_seconds:.0f} seconds until the next feed is due ---")
+            time.sleep(sleep_seconds)
         except KeyboardInterrupt:
             logging.info("Shutting down gracefully...")
             break
         except Exception as e:
             logging.error(f"Error during pipeline: {e}")
             logging.info("Continuing after error...")
-            time.sleep(60)  # 에러 발생 시 1분 대기 후 재시도
\ No newline at end of file
+            time.sleep(60)  # 에러 발생 시 1분 대기 후 재시도
+
+    if embedding_server is not None and embedding_server.poll() is None:
+        embedding_server.terminate()
+        embedding_server.wait(timeout=30)
@@ -7,6 +7,14 @@ daily_vectorizer.py
 - Generates vector embeddings for them using an AI model.
 - Updates the 'embedding' column in the database.
 - Includes a locking mechanism to prevent concurrent runs.
+- `--workers N|auto` encodes in a multi-process pool (encoding_pool.py) instead of the embedding
+  service or a single in-process model; meant for large backfills on many-core nodes.
+- `--lease` runs as one of many workers (on one host or several): each worker claims disjoint
+  chunks of embedding IS NULL rows through lease columns in the DB (db/migrations/002) instead of
+  taking the host-local lock file. Leases of a worker that dies expire and are claimed by others.
+- `--drain` pages through the whole embedding IS NULL backlog (keyset pagination on id) with the
+  DB read, encoding and DB write running as overlapped stages connected by bounded queues.
+  The last fully written page is checkpointed, so a crashed drain resumes where it stopped.
 """
 
 import os
@@ -14,20 +22,25 @@ import sys
 import logging
 import time
 import json
-import gc
+import queue
+import argparse
+import socket
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import pymysql
 
+from embedding_utils import encode_texts, encode_with_cache, release_local_model
+from encoding_pool import ENCODE_WORKERS, EncodingPool, resolve_workers
+from article_ann_index import ArticleAnnIndex
+
 # --- Configuration & Setup ---
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-MODEL_NAME = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
     "port": int(os.getenv("DB_PORT", 3306)),
@@ -37,7 +50,13 @@ DB_CONFIG = {
 }
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "500"))  # Increased for local processing
+WRITE_CHUNK_SIZE = int(os.getenv("EMBEDDING_WRITE_CHUNK_SIZE", "100"))  # Rows per bulk UPDATE statement
 LOCK_FILE_TIMEOUT = int(os.getenv("INDEXER_LOCK_TIMEOUT", "3600")) # 1 hour
+DRAIN_PAGE_SIZE = int(os.getenv("DRAIN_PAGE_SIZE", "1000"))  # Rows per keyset page in --drain mode
+DRAIN_QUEUE_DEPTH = int(os.getenv("DRAIN_QUEUE_DEPTH", "2"))  # Pages buffered between stages
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), 'vectorizer_checkpoint.json')
+LEASE_CHUNK_SIZE = int(os.getenv("EMBED_LEASE_CHUNK_SIZE", "500"))  # Rows claimed per lease in --lease mode
+LEASE_SECONDS = int(os.getenv("EMBED_LEASE_SECONDS", "600"))  # A dead worker's rows become claimable after this
 
 if 'tidbcloud.com' in DB_CONFIG.get('host', '') or os.getenv("DB_SSL_ENABLED") == 'true':
     # TiDB Cloud requires SSL or explicit non-verification for some clients
@@ -61,18 +80,23 @@ def acquire_lock():
         lock_time = os.path.getmtime(LOCK_FILE_PATH)
         if (time.time() - lock_time) > LOCK_FILE_TIMEOUT:
             logging.warning(f"Found stale lock file (older than {LOCK_FILE_TIMEOUT}s), removing it.")
-            os.remove(LOCK_FILE_PATH)
-        else:
-            logging.info(f"Lock file exists (created at {datetime.fromtimestamp(lock_time)}), another process is likely running. Exiting.")
-            return False
+            try:
+                os.remove(LOCK_FILE_PATH)
+            except FileNotFoundError:
+                pass
     try:
-        with open(LOCK_FILE_PATH, 'w') as f:
-            f.write(str(os.getpid()))
-        logging.info(f"Acquired lock: {LOCK_FILE_PATH}")
-        return True
-    except IOError as e:
+        # O_EXCL makes check-and-create a single atomic step, so two runs can never both hold the lock
+        fd = os.open(LOCK_FILE_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        logging.info("Lock file exists, another process is likely running. Exiting.")
+        return False
+    except OSError as e:
         logging.error(f"Failed to acquire lock: {e}")
         return False
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(os.getpid()))
+    logging.info(f"Acquired lock: {LOCK_FILE_PATH}")
+    return True
 
 def release_lock():
     try:
@@ -82,19 +106,361 @@ def release_lock():
     except IOError as e:
         logging.error(f"Failed to release lock: {e}")
 
+def refresh_lock():
+    """Keeps a long --drain run from being mistaken for a stale lock."""
+    try:
+        os.utime(LOCK_FILE_PATH)
+    except OSError:
+        pass
+
+# --- Bulk Write-back ---
+def write_embeddings(cnx, cursor, updates: List[tuple], lease_owner: Optional[str] = None) -> List[int]:
+    """
+    Writes (embedding_json, id) pairs back in chunks of WRITE_CHUNK_SIZE.
+    Each chunk is one multi-row UPDATE joined against a derived table and committed on its own,
+    so a large batch never becomes one long transaction. A failed chunk is rolled back and left
+    with embedding IS NULL for the next run. With `lease_owner` (--lease), only rows still leased
+    to that owner are written and their lease is released in the same statement.
+    Returns the ids that were written.
+    """
+    written = []
+    for start in range(0, len(updates), WRITE_CHUNK_SIZE):
+        chunk = updates[start:start + WRITE_CHUNK_SIZE]
+        rows_sql = " UNION ALL ".join(["SELECT %s AS id, %s AS embedding"] * len(chunk))
+        params = []
+        for embedding_json, article_id in chunk:
+            params.extend((article_id, embedding_json))
+        lease_sql = ""
+        if lease_owner is not None:
+            lease_sql = ", t.embed_lease_owner = NULL, t.embed_lease_until = NULL WHERE t.embed_lease_owner = %s"
+            params.append(lease_owner)
+        try:
+            cursor.execute(
+                f"UPDATE tn_home_article t JOIN ({rows_sql}) v ON t.id = v.id SET t.embedding = v.embedding{lease_sql}",
+                params,
+            )
+            cnx.commit()
+            written.extend(article_id for _, article_id in chunk)
+        except pymysql.Error as e:
+            cnx.rollback()
+            logging.error(f"Failed to write embeddings for chunk starting at row {start} ({len(chunk)} rows): {e}")
+    return written
+
+def update_ann_index(articles: List[Dict], embeddings, written_ids: set, index: Optional[ArticleAnnIndex] = None) -> None:
+    """Appends the embeddings that reached the DB to the local ANN index used by topic_matcher_db.py."""
+    rows = [(article, vec) for article, vec in zip(articles, embeddings) if article['id'] in written_ids]
+    if not rows:
+        return
+    try:
+        index = index or ArticleAnnIndex().load()
+        added = index.add(
+            [article['id'] for article, _ in rows],
+            np.stack([vec for _, vec in rows]),
+            [article['side'] for article, _ in rows],
+            [article['published_at'] for article, _ in rows],
+        )
+        logging.info(f"Added {added} embeddings to the ANN index ({len(index)} rows).")
+    except (OSError, ValueError) as e:
+        # The DB stays the source of truth; `article_ann_index.py --rebuild` restores the index
+        logging.error(f"Failed to update ANN index: {e}")
+
+# --- Encoding ---
+_pool: Optional[EncodingPool] = None  # Set by main() when --workers > 1
+
+def embed_articles(articles: List[Dict], label: str = "vectorizer"):
+    """Returns one embedding per article, or an empty list when the batch could not be encoded."""
+    texts = [f"passage: {article['title']} {article['description'] or ''}"[:1024] for article in articles] # Truncate to 1024 chars
+    try:
+        if _pool is not None:
+            return encode_with_cache(texts, _pool.encode, label=label)
+        # Uses the resident embedding_server.py when it is running; otherwise loads the model here
+        # and encodes in length-sorted batches
+        return encode_texts(texts, label=label)
+    except Exception as e:
+        logging.error(f"Failed to embed batch of {len(texts)} articles: {e}")
+        return []
+
+def store_embeddings(cnx, cursor, articles: List[Dict], embeddings, index: Optional[ArticleAnnIndex] = None,
+                     lease_owner: Optional[str] = None) -> List[int]:
+    """Writes the embeddings back to the DB and the ANN index. Returns the ids that were written."""
+    updates = [(json.dumps(vec.tolist()), article['id']) for article, vec in zip(articles, embeddings)]
+    if not updates:
+        return []
+    started = time.perf_counter()
+    written = write_embeddings(cnx, cursor, updates, lease_owner)
+    elapsed = time.perf_counter() - started
+    logging.info(f"Successfully updated embeddings for {len(written)}/{len(updates)} articles in {elapsed:.2f}s "
+                 f"({len(written) / max(elapsed, 1e-9):.1f} rows/sec, chunk size {WRITE_CHUNK_SIZE}).")
+    update_ann_index(articles, embeddings, set(written), index)
+    return written
+
+# --- Drain Checkpoint ---
+def load_checkpoint() -> int:
+    """Returns the last id of the last page a previous drain fully processed (0 if none)."""
+    try:
+        with open(CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            return int(json.load(f)['last_id'])
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Ignoring unreadable checkpoint {CHECKPOINT_PATH}: {e}")
+        return 0
+
+def save_checkpoint(last_id: int, written: int) -> None:
+    tmp_path = f"{CHECKPOINT_PATH}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_id': last_id, 'written': written, 'updated_at': datetime.now(timezone.utc).isoformat()}, f)
+        os.replace(tmp_path, CHECKPOINT_PATH)
+    except OSError as e:
+        logging.warning(f"Failed to save checkpoint {CHECKPOINT_PATH}: {e}")
+
+def clear_checkpoint() -> None:
+    try:
+        os.remove(CHECKPOINT_PATH)
+    except FileNotFoundError:
+        pass
+
+# --- Drain Mode ---
+_END = object()  # Sentinel passed down the pipeline when the previous stage is finished
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once another stage has failed."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=1)
+        except queue.Empty:
+            continue
+    return _END
+
+def read_pages(start_id: int, pages: queue.Queue, stop: threading.Event, errors: List[Exception]) -> None:
+    """Stage 1: keyset-paginates over embedding IS NULL rows on its own connection."""
+    cnx = None
+    try:
+        cnx = pymysql.connect(**DB_CONFIG)
+        cursor = cnx.cursor(pymysql.cursors.DictCursor)
+        last_id = start_id
+        while not stop.is_set():
+            cursor.execute(
+                "SELECT id, title, description, side, published_at FROM tn_home_article "
+                "WHERE embedding IS NULL AND id > %s ORDER BY id LIMIT %s",
+                (last_id, DRAIN_PAGE_SIZE),
+            )
+            page = cursor.fetchall()
+            cnx.commit()  # End the read snapshot so later pages see rows inserted meanwhile
+            if not page:
+                break
+            last_id = page[-1]['id']
+            if not _put(pages, page, stop):
+                break
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(pages, _END, stop)
+        if cnx and cnx.open:
+            cnx.close()
+
+def lease_owner() -> str:
+    """Worker id stored in embed_lease_owner (host:pid); a claim number is appended per chunk."""
+    return f"{socket.gethostname()[:40]}:{os.getpid()}"
+
+def claim_chunk(cnx, cursor, owner: str) -> List[Dict]:
+    """
+    Leases up to LEASE_CHUNK_SIZE unclaimed (or expired) rows to `owner` and returns them.
+    The claim is a single UPDATE, so concurrent workers never receive the same row. Lease times use
+    the DB clock, so workers on hosts with skewed clocks agree on expiry.
+    """
+    cursor.execute(
+        "UPDATE tn_home_article SET embed_lease_owner = %s, embed_lease_until = UTC_TIMESTAMP() + INTERVAL %s SECOND "
+        "WHERE embedding IS NULL AND (embed_lease_until IS NULL OR embed_lease_until < UTC_TIMESTAMP()) "
+        "ORDER BY id LIMIT %s",
+        (owner, LEASE_SECONDS, LEASE_CHUNK_SIZE),
+    )
+    claimed = cursor.rowcount
+    cnx.commit()
+    if not claimed:
+        return []
+    cursor.execute(
+        "SELECT id, title, description, side, published_at, embed_lease_owner FROM tn_home_article "
+        "WHERE embed_lease_owner = %s AND embedding IS NULL ORDER BY id",
+        (owner,),
+    )
+    chunk = cursor.fetchall()
+    cnx.commit()
+    return chunk
+
+def renew_lease(cnx, cursor, chunk: List[Dict]) -> List[Dict]:
+    """
+    Restarts a chunk's lease when it is dequeued for encoding, so the time it waited behind the
+    claimer's read-ahead does not count against LEASE_SECONDS. Rows whose lease expired and were
+    claimed by another worker in the meantime are dropped instead of being encoded twice.
+    """
+    owner = chunk[0]['embed_lease_owner']
+    cursor.execute(
+        "UPDATE tn_home_article SET embed_lease_until = UTC_TIMESTAMP() + INTERVAL %s SECOND "
+        "WHERE embed_lease_owner = %s AND embedding IS NULL",
+        (LEASE_SECONDS, owner),
+    )
+    cursor.execute("SELECT id FROM tn_home_article WHERE embed_lease_owner = %s AND embedding IS NULL", (owner,))
+    leased = {row['id'] for row in cursor.fetchall()}
+    cnx.commit()
+    if len(leased) < len(chunk):
+        logging.warning(f"[drain] {len(chunk) - len(leased)} rows of {owner} were re-leased by another worker; skipping them.")
+    return [article for article in chunk if article['id'] in leased]
+
+def claim_pages(worker: str, pages: queue.Queue, stop: threading.Event, errors: List[Exception]) -> None:
+    """Stage 1 (--lease): claims chunks until no unleased NULL rows are left."""
+    cnx = None
+    try:
+        cnx = pymysql.connect(**DB_CONFIG)
+        cursor = cnx.cursor(pymysql.cursors.DictCursor)
+        claim_number = 0
+        while not stop.is_set():
+            claim_number += 1
+            # A fresh owner per claim: rows of a failed chunk keep their lease until it expires
+            # instead of being picked up again by this worker's next claim
+            chunk = claim_chunk(cnx, cursor, f"{worker}:{claim_number}")
+            if not chunk:
+                break
+            if not _put(pages, chunk, stop):
+                break
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(pages, _END, stop)
+        if cnx and cnx.open:
+            cnx.close()
+
+def write_pages(encoded: queue.Queue, stop: threading.Event, errors: List[Exception], totals: Dict[str, int],
+                checkpoint: bool = True) -> None:
+    """Stage 3: writes encoded pages in order and (unless leasing) checkpoints after each one."""
+    cnx = None
+    try:
+        cnx = pymysql.connect(**DB_CONFIG)
+        cursor = cnx.cursor()
+        index = ArticleAnnIndex().load()
+        started = time.perf_counter()
+        while True:
+            item = _get(encoded, stop)
+            if item is _END:
+                break
+            page, embeddings = item
+            # Leased chunks carry their owner; the write only lands while the lease is still ours
+            written = store_embeddings(cnx, cursor, page, embeddings, index, page[0].get('embed_lease_owner'))
+            totals['read'] += len(page)
+            totals['written'] += len(written)
+            if checkpoint:
+                # Rows that failed to encode or write stay NULL; the next drain starts over from id 0 and retries them
+                save_checkpoint(page[-1]['id'], totals['written'])
+                refresh_lock()
+            elapsed = time.perf_counter() - started
+            logging.info(f"[drain] {totals['written']}/{totals['read']} rows written up to id {page[-1]['id']} "
+                         f"({totals['written'] / max(elapsed, 1e-9):.1f} rows/sec overall).")
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        if cnx and cnx.open:
+            cnx.close()
+
+def drain(worker: Optional[str] = None) -> bool:
+    """
+    Vectorizes the whole backlog: reader thread -> encoding (this thread) -> writer thread.
+    Bounded queues keep at most DRAIN_QUEUE_DEPTH pages in flight per stage, so reading the next
+    page and writing the previous one overlap with encoding. With `worker` set, the pages are chunks
+    leased to this worker (claim_pages) and the leases take the place of the local checkpoint.
+    Returns True when the backlog was drained.
+    """
+    stop = threading.Event()
+    errors: List[Exception] = []
+    totals = {'read': 0, 'written': 0}
+    pages: queue.Queue = queue.Queue(maxsize=DRAIN_QUEUE_DEPTH)
+    encoded: queue.Queue = queue.Queue(maxsize=DRAIN_QUEUE_DEPTH)
+    if worker:
+        logging.info(f"[drain] Claiming chunks of {LEASE_CHUNK_SIZE} rows as {worker} (lease {LEASE_SECONDS}s).")
+        reader = threading.Thread(target=claim_pages, args=(worker, pages, stop, errors), name="drain-claimer", daemon=True)
+    else:
+        start_id = load_checkpoint()
+        if start_id:
+            logging.info(f"[drain] Resuming after id {start_id} (checkpoint {CHECKPOINT_PATH}).")
+        reader = threading.Thread(target=read_pages, args=(start_id, pages, stop, errors), name="drain-reader", daemon=True)
+    writer = threading.Thread(target=write_pages, args=(encoded, stop, errors, totals, not worker),
+                              name="drain-writer", daemon=True)
+    reader.start()
+    writer.start()
+
+    started = time.perf_counter()
+    lease_cnx = None
+    try:
+        if worker:
+            lease_cnx = pymysql.connect(**DB_CONFIG)
+            lease_cursor = lease_cnx.cursor(pymysql.cursors.DictCursor)
+        while True:
+            page = _get(pages, stop)
+            if page is _END:
+                break
+            if worker:
+                page = renew_lease(lease_cnx, lease_cursor, page)
+                if not page:
+                    continue
+            if not _put(encoded, (page, embed_articles(page, label="drain")), stop):
+                break
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        _put(encoded, _END, stop)
+        writer.join()
+        reader.join()
+        if lease_cnx and lease_cnx.open:
+            lease_cnx.close()
+
+    elapsed = time.perf_counter() - started
+    if errors:
+        resume = "its leases expire after EMBED_LEASE_SECONDS" if worker else "re-run with --drain to resume from the checkpoint"
+        logging.error(f"[drain] Stopped after {totals['written']} rows: {errors[0]}; {resume}.")
+        return False
+    if not worker:
+        clear_checkpoint()
+    logging.info(f"[drain] Backlog drained: {totals['written']}/{totals['read']} rows in {elapsed:.1f}s "
+                 f"({totals['written'] / max(elapsed, 1e-9):.1f} rows/sec).")
+    return True
+
 # --- Main Logic ---
-def main():
+def main(drain_backlog: bool = False, workers: int = 1, lease: bool = False):
+    global _pool
     logging.info("--- Vector Indexer Starting ---")
-    if not acquire_lock():
+    # Lease workers coordinate through the DB, so any number of them may run side by side
+    if not lease and not acquire_lock():
         return
 
     cnx = None
     try:
+        if workers > 1:
+            _pool = EncodingPool(workers)
+        if lease:
+            drain(worker=lease_owner())
+            return
+        if drain_backlog:
+            drain()
+            return
+
         cnx = pymysql.connect(**DB_CONFIG)
         cursor = cnx.cursor(pymysql.cursors.DictCursor)
         logging.info("DB connected.")
 
-        cursor.execute(f"SELECT id, title, description FROM tn_home_article WHERE embedding IS NULL LIMIT {BATCH_SIZE}")
+        cursor.execute(f"SELECT id, title, description, side, published_at FROM tn_home_article WHERE embedding IS NULL LIMIT {BATCH_SIZE}")
         articles_to_index = cursor.fetchall()
 
         if not articles_to_index:
@@ -102,31 +468,8 @@ def main():
             return
 
         logging.info(f"Processing batch of {len(articles_to_index)} articles...")
-        
-        # Load model only if there are articles to process
-        model = SentenceTransformer(MODEL_NAME) 
-        
-        updates = []
-        for article in articles_to_index:
-            try:
-                text_to_embed = f"passage: {article['title']} {article['description'] or ''}"[:1024] # Truncate to 1024 tokens
-                embedding = model.encode(text_to_embed, normalize_embeddings=True).tolist()
-                updates.append((json.dumps(embedding), article['id']))
-            except Exception as e:
-                logging.error(f"Failed to embed article {article['id']}: {e}")
-
-        if updates:
-            update_query = "UPDATE tn_home_article SET embedding = %s WHERE id = %s"
-            # Execute one by one to avoid timeout with large vectors
-            for update_data in updates:
-                cursor.execute(update_query, update_data)
-            cnx.commit()
-            logging.info(f"Successfully updated embeddings for {len(updates)} articles.")
-            
-        # Force garbage collection to free memory
-        del model
-        gc.collect()
-        logging.info("Memory cleanup completed.")
+        embeddings = embed_articles(articles_to_index)
+        store_embeddings(cnx, cursor, articles_to_index, embeddings)
             
     except Exception as e:
         logging.exception(f"An unexpected error occurred during indexing: {e}")
@@ -134,8 +477,19 @@ def main():
         if cnx and cnx.open:
             cursor.close()
             cnx.close()
-        release_lock()
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        # Free the in-process model (if one was loaded) before exiting
+        release_local_model()
+        if not lease:
+            release_lock()
         logging.info("--- Vector Indexer Finished ---")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Embeds tn_home_article rows whose embedding is NULL")
+    parser.add_argument('--drain', action='store_true', help="process the whole backlog instead of one batch")
+    parser.add_argument('--lease', action='store_true', help="claim chunks through DB leases (run any number of these)")
+    parser.add_argument('--workers', default=ENCODE_WORKERS, help="encoding processes: N or auto (default: ENCODE_WORKERS)")
+    args = parser.parse_args()
+    main(drain_backlog=args.drain, workers=resolve_workers(args.workers), lease=args.lease)
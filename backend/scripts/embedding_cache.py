@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+embedding_cache.py
+- Content-addressed cache of normalized embeddings, shared by every script through embedding_utils.encode_texts().
+- Key: blake2b-128 of (model name, normalized text). Wire copies (연합뉴스/뉴시스) and passages the topic
+  matchers re-encode every run hit the cache instead of the model.
+- Storage (one directory per model under EMBED_CACHE_DIR, one "generation" at a time):
+    vectors.<gen>.f32  append-only float32 rows, read through np.memmap
+    index.<gen>.bin    append-only (16-byte key, uint64 row) records, loaded into a dict at startup
+    meta.json          model name, vector dimension and current generation
+  (generation 0 keeps the original vectors.f32 / index.bin names.)
+- Appends take an exclusive file lock (fcntl, where available) so the embedding server and scripts
+  running the in-process fallback can share one cache. Vectors are written before their index
+  record, so a crash never leaves an index entry pointing at a missing row; a torn tail left by a
+  crash is truncated before the next append so later rows stay aligned.
+- When EMBED_CACHE_MAX_ROWS is reached the cache rotates: a new generation keeps the most recently
+  added half plus every entry this process has read, and the rest is dropped. The previous
+  generation's files are kept until the next rotation for readers that have not switched yet.
+"""
+
+import os
+import re
+import json
+import struct
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 동작 (단일 프로세스 사용 가정)
+    fcntl = None
+
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(os.path.dirname(__file__), 'embedding_cache'))
+EMBED_CACHE_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", "500000"))  # 768차원 기준 약 1.5GB
+
+_INDEX_RECORD = struct.Struct('<16sQ')
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키와 인코딩 입력에 쓰는 정규화: NFC + 연속 공백 정리."""
+    return " ".join(unicodedata.normalize('NFC', text).split())
+
+
+class EmbeddingCache:
+    """정규화된 텍스트의 해시를 키로 임베딩 벡터를 저장하는 append-only 캐시."""
+
+    def __init__(self, model_name: str, directory: str = EMBED_CACHE_DIR, max_rows: int = EMBED_CACHE_MAX_ROWS):
+        self.model_name = model_name
+        self.max_rows = max_rows
+        self.directory = os.path.join(directory, re.sub(r'[^A-Za-z0-9._-]+', '_', model_name))
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.lock_path = os.path.join(self.directory, '.lock')
+        self.dim: Optional[int] = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._rows: Dict[bytes, int] = {}
+        self._row_count = 0
+        self._index_offset = 0
+        self._vectors: Optional[np.memmap] = None
+        self._hot: set = set()  # 이 프로세스에서 조회된 키: 교체(rotation) 때 남김
+        self._load_meta()
+
+    # --- 키 / 메타데이터 ---
+    def key(self, normalized_text: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.model_name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalized_text.encode('utf-8'))
+        return digest.digest()
+
+    def _path(self, kind: str, generation: Optional[int] = None) -> str:
+        generation = self.generation if generation is None else generation
+        name = 'index.bin' if kind == 'index' else 'vectors.f32'
+        if generation:
+            stem, ext = name.split('.')
+            name = f"{stem}.{generation}.{ext}"
+        return os.path.join(self.directory, name)
+
+    @property
+    def index_path(self) -> str:
+        return self._path('index')
+
+    @property
+    def vectors_path(self) -> str:
+        return self._path('vectors')
+
+    def _load_meta(self) -> None:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.dim = int(meta['dim'])
+            generation = int(meta.get('generation', 0))
+        except FileNotFoundError:
+            self.dim = None
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"[EmbeddingCache] Ignoring unreadable {self.meta_path}: {e}")
+            self.dim = None
+            return
+        if generation != self.generation:
+            # 다른 프로세스가 교체했으면 새 세대의 인덱스를 처음부터 읽음
+            self.generation = generation
+            self._rows = {}
+            self._row_count = 0
+            self._index_offset = 0
+            self._vectors = None
+
+    def _write_meta(self) -> None:
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'generation': self.generation}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    # --- 읽기 ---
+    def _refresh_index(self) -> None:
+        """현재 세대를 확인하고, 다른 프로세스가 추가한 레코드까지 인덱스를 읽어옵니다."""
+        self._load_meta()
+        if self.dim is None:
+            return
+        try:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._index_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        usable = len(data) - len(data) % _INDEX_RECORD.size
+        for key, row in _INDEX_RECORD.iter_unpack(data[:usable]):
+            self._rows[key] = row
+            self._row_count = max(self._row_count, row + 1)
+        self._index_offset += usable
+
+    def _vector_rows(self, needed_rows: int) -> np.ndarray:
+        if self._vectors is None or self._vectors.shape[0] < needed_rows:
+            rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            self._vectors = np.memmap(self.vectors_path, dtype='<f4', mode='r', shape=(rows, self.dim))
+        return self._vectors
+
+    def lookup(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """keys 중 캐시에 있는 것은 {위치: 벡터}로, 없는 것은 위치 목록으로 반환합니다."""
+        if any(key not in self._rows for key in keys):
+            self._refresh_index()
+        found: Dict[int, np.ndarray] = {}
+        missing: List[int] = []
+        rows = [self._rows.get(key) for key in keys]
+        present = [row for row in rows if row is not None]
+        vectors = self._vector_rows(max(present) + 1) if present else None
+        for position, row in enumerate(rows):
+            if row is None:
+                missing.append(position)
+            else:
+                found[position] = np.array(vectors[row], dtype=np.float32)
+                self._hot.add(keys[position])
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    # --- 쓰기 ---
+    def add(self, keys: List[bytes], vecs: np.ndarray) -> None:
+        if not keys:
+            return
+        vecs = np.ascontiguousarray(vecs, dtype='<f4')
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh_index()
+                if self.dim is None:
+                    self.dim = int(vecs.shape[1])
+                    self._write_meta()
+                elif vecs.shape[1] != self.dim:
+                    logging.warning(f"[EmbeddingCache] Dimension mismatch ({vecs.shape[1]} != {self.dim}); not caching.")
+                    return
+                new = [(key, i) for i, key in enumerate(keys) if key not in self._rows]
+                if not new:
+                    return
+                if self._row_count + len(new) > self.max_rows:
+                    self._rotate()
+                new = new[:max(0, self.max_rows - self._row_count)]
+                self._truncate_torn_tail()
+                with open(self.vectors_path, 'ab') as vectors_file:
+                    vectors_file.write(vecs[[i for _, i in new]].tobytes())
+                    vectors_file.flush()
+                    os.fsync(vectors_file.fileno())
+                records = [(key, self._row_count + n) for n, (key, _) in enumerate(new)]
+                with open(self.index_path, 'ab') as index_file:
+                    index_file.write(b''.join(_INDEX_RECORD.pack(key, row) for key, row in records))
+                self._rows.update(records)
+                self._row_count += len(new)
+                self._index_offset += len(records) * _INDEX_RECORD.size
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _truncate_torn_tail(self) -> None:
+        """중단된 쓰기가 남긴 꼬리(인덱스에 없는 벡터, 잘린 레코드)를 잘라 다음 행 번호와 파일 위치를 맞춥니다. 잠금 안에서 호출."""
+        for path, size in ((self.vectors_path, self._row_count * self.dim * 4), (self.index_path, self._index_offset)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                logging.warning(f"[EmbeddingCache] Truncating {path} to {size} bytes after an incomplete write.")
+                os.truncate(path, size)
+
+    def _rotate(self) -> None:
+        """최근 추가된 절반과 이 프로세스가 조회한 키만 남긴 새 세대로 교체합니다. 잠금 안에서 호출."""
+        keep_from = self._row_count - self.max_rows // 2
+        kept = sorted(((row, key) for key, row in self._rows.items() if row >= keep_from or key in self._hot))
+        kept = kept[-(self.max_rows // 2):] if self.max_rows > 1 else []
+        vectors = self._vector_rows(self._row_count)
+        old_generation, self.generation = self.generation, self.generation + 1
+        np.asarray(vectors[[row for row, _ in kept]], dtype='<f4').tofile(self.vectors_path)
+        with open(self.index_path, 'wb') as f:
+            f.write(b''.join(_INDEX_RECORD.pack(key, n) for n, (_, key) in enumerate(kept)))
+        self._write_meta()
+        # 직전 세대는 아직 교체를 모르는 reader가 열 수 있으므로 다음 교체 때까지 남김
+        if old_generation > 0:
+            for kind in ('index', 'vectors'):
+                try:
+                    os.remove(self._path(kind, old_generation - 1))
+                except FileNotFoundError:
+                    pass
+        logging.info(f"[EmbeddingCache] Rotated {self.directory} to generation {self.generation}: "
+                     f"kept {len(kept)} of {len(self._rows)} entries.")
+        self._rows = {key: n for n, (_, key) in enumerate(kept)}
+        self._row_count = len(kept)
+        self._index_offset = len(kept) * _INDEX_RECORD.size
+        self._vectors = None
+        self._hot &= self._rows.keys()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._rows),
+            'generation': self.generation,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+embedding_server.py
+- Long-lived embedding service: loads the SentenceTransformer model once and keeps it warm.
+- POST /encode  {"texts": [...], "model": "<model key>"}
+    -> little-endian float32 matrix (application/octet-stream), shape in X-Embedding-Count / X-Embedding-Dim.
+- GET /query?q=<text>[&model=<model key>][&format=json]  -> embedding of one search query ("query: " prefix added here),
+    served from a bounded LRU cache when the same query was seen recently; X-Cache is HIT or MISS.
+    Binary float32 by default, JSON list with format=json.
+- GET /health   -> JSON with the model name, request/batch counters and query cache hit rate.
+- The model key is embedding_utils.model_key() (EMBED_MODEL, plus "@onnx" for the int8 backend); requests
+  for another key are rejected with 409 so a client never caches vectors from a different backend.
+- Texts found in the content-addressed embedding cache (embedding_cache.py) skip the model.
+- Requests that arrive within EMBED_COALESCE_WINDOW of each other are merged into one encode_batched()
+  call, so concurrent jobs (vectorizer, topic matchers, search) share forward passes.
+- Scripts reach it through embedding_utils.encode_texts(); they fall back to an in-process model
+  when the service is not running.
+- Usage: python embedding_server.py   (listens on EMBED_SERVER_HOST:EMBED_SERVER_PORT, default 127.0.0.1:8765)
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from embedding_utils import MODEL_NAME, encode_batched, encode_with_cache, get_embedding_cache, get_local_model, model_key, normalize_query
+
+# --- Configuration ---
+SERVER_HOST = os.getenv("EMBED_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("EMBED_SERVER_PORT", "8765"))
+COALESCE_WINDOW = float(os.getenv("EMBED_COALESCE_WINDOW", "0.01"))  # 다른 요청을 기다리는 최대 시간(초)
+COALESCE_MAX_TEXTS = int(os.getenv("EMBED_COALESCE_MAX_TEXTS", "1024"))  # 한 번에 합쳐서 인코딩할 최대 텍스트 수
+MAX_TEXTS_PER_REQUEST = int(os.getenv("EMBED_SERVER_MAX_TEXTS", "4096"))
+QUERY_CACHE_SIZE = int(os.getenv("EMBED_QUERY_CACHE_SIZE", "4096"))  # 캐시할 검색어 수
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+logging.basicConfig(
+    level=getattr(logging, LOG_LEVEL, logging.INFO),
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+
+
+@dataclass
+class EncodeJob:
+    texts: List[str]
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Optional[np.ndarray] = None
+    error: Optional[Exception] = None
+
+
+class EncodeCoalescer:
+    """동시에 들어온 인코딩 요청을 모아서 한 번의 배치 인코딩으로 처리합니다."""
+
+    def __init__(self, model, window: float = COALESCE_WINDOW, max_texts: int = COALESCE_MAX_TEXTS):
+        self.model = model
+        self.window = window
+        self.max_texts = max_texts
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self._queue: "queue.Queue[EncodeJob]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="encode-coalescer", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        job = EncodeJob(texts)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _run(self) -> None:
+        while True:
+            jobs = [self._queue.get()]
+            total = len(jobs[0].texts)
+            deadline = time.monotonic() + self.window
+            while total < self.max_texts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                total += len(job.texts)
+            self._encode_jobs(jobs)
+
+    def _encode_jobs(self, jobs: List[EncodeJob]) -> None:
+        texts = [text for job in jobs for text in job.texts]
+        try:
+            label = f"server x{len(jobs)}"
+            # 클라이언트가 이미 캐시를 확인했더라도, 다른 프로세스가 방금 추가한 벡터나 /query 요청은 여기서 걸러짐
+            vecs = encode_with_cache(texts, lambda missing: encode_batched(self.model, missing, label=label), label=label)
+            offset = 0
+            for job in jobs:
+                job.result = vecs[offset:offset + len(job.texts)]
+                offset += len(job.texts)
+        except Exception as e:
+            logging.exception(f"Failed to encode {len(texts)} texts: {e}")
+            for job in jobs:
+                job.error = e
+        finally:
+            self.requests += len(jobs)
+            self.texts += len(texts)
+            self.batches += 1
+            for job in jobs:
+                job.done.set()
+
+
+class QueryCache:
+    """검색어 임베딩을 위한 크기 제한 LRU 캐시. 적중률 통계를 함께 기록합니다."""
+
+    def __init__(self, capacity: int = QUERY_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        with self._lock:
+            self._items[key] = vec
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    coalescer: EncodeCoalescer = None
+    query_cache: QueryCache = None
+    started_at = time.time()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/query":
+            self._handle_query(parse_qs(url.query))
+            return
+        if url.path != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        coalescer = EmbeddingHandler.coalescer
+        embedding_cache = get_embedding_cache()
+        self._send_json(200, {
+            "model": MODEL_NAME,
+            "model_key": model_key(),
+            "dim": coalescer.model.get_sentence_embedding_dimension(),
+            "uptime_seconds": time.time() - EmbeddingHandler.started_at,
+            "requests": coalescer.requests,
+            "texts": coalescer.texts,
+            "batches": coalescer.batches,
+            "query_cache": EmbeddingHandler.query_cache.stats(),
+            "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        })
+
+    def _handle_query(self, params: dict) -> None:
+        query = normalize_query(params.get("q", [""])[0])
+        if not query:
+            self._send_json(400, {"error": "q is required"})
+            return
+        if params.get("model", [model_key()])[0] != model_key():
+            self._send_json(409, {"error": f"server model is {model_key()}"})
+            return
+        cache = EmbeddingHandler.query_cache
+        vec = cache.get(query)
+        cache_status = "HIT"
+        if vec is None:
+            cache_status = "MISS"
+            try:
+                # E5 모델은 검색어에 'query: ' 접두사가 필요
+                vec = EmbeddingHandler.coalescer.encode([f"query: {query}"])[0]
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            cache.put(query, vec)
+
+        if params.get("format", [""])[0] == "json":
+            self._send_json(200, vec.tolist(), {"X-Cache": cache_status})
+        else:
+            self._send_vectors(vec.reshape(1, -1), {"X-Cache": cache_status})
+
+    def do_POST(self):
+        if self.path != "/encode":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            texts = body["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("texts must be a list of strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"invalid request: {e}"})
+            return
+        if body.get("model", model_key()) != model_key():
+            # 다른 모델이나 백엔드(torch/onnx)의 벡터가 섞이면 DB에 저장된 임베딩, 클라이언트 캐시와 맞지 않으므로 거절
+            self._send_json(409, {"error": f"server model is {model_key()}"})
+            return
+        if len(texts) > MAX_TEXTS_PER_REQUEST:
+            self._send_json(413, {"error": f"at most {MAX_TEXTS_PER_REQUEST} texts per request"})
+            return
+
+        try:
+            vecs = EmbeddingHandler.coalescer.encode(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_vectors(vecs)
+
+    def _send_vectors(self, vecs: np.ndarray, headers: Optional[dict] = None) -> None:
+        payload = np.ascontiguousarray(vecs, dtype='<f4').tobytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-Embedding-Count", str(vecs.shape[0]))
+        self.send_header("X-Embedding-Dim", str(vecs.shape[1]))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status: int, body, headers: Optional[dict] = None) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def main():
+    logging.info("--- Embedding Server Starting ---")
+    EmbeddingHandler.coalescer = EncodeCoalescer(get_local_model())
+    EmbeddingHandler.query_cache = QueryCache()
+    server = ThreadingHTTPServer((SERVER_HOST, SERVER_PORT), EmbeddingHandler)
+    server.daemon_threads = True
+    logging.info(f"Serving {model_key()} on http://{SERVER_HOST}:{SERVER_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Shutting down...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
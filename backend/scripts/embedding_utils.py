@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+embedding_utils.py
+- Shared helpers for encoding article/query texts with the SentenceTransformer model.
+- encode_texts() is what scripts call: texts already in the content-addressed embedding_cache.py store
+  are served from it; the rest go to the resident embedding_server.py when it is running
+  (EMBED_SERVICE_URL), and the model is only loaded in-process when the service is unavailable.
+- encode_batched() sorts texts by length into buckets of ENCODE_BATCH_SIZE so each forward pass
+  pads to a similar length, encodes bucket by bucket and returns vectors in the original order.
+- Per-batch throughput (texts/sec) is logged.
+"""
+
+import os
+import gc
+import time
+import json
+import logging
+from typing import Callable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_cache import EmbeddingCache, normalize_text
+
+# 이 모듈을 먼저 import하는 스크립트에서도 .env 설정(EMBED_MODEL 등)이 반영되도록 직접 로드
+dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+MODEL_NAME = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "32"))
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()  # torch | onnx (onnx_encoder.py, int8)
+EMBED_SERVICE_URL = os.getenv("EMBED_SERVICE_URL", "http://127.0.0.1:8765").rstrip('/')  # 비우면 항상 프로세스 내 모델 사용
+EMBED_SERVICE_TIMEOUT = float(os.getenv("EMBED_SERVICE_TIMEOUT", "300"))
+EMBED_CLIENT_CHUNK = int(os.getenv("EMBED_CLIENT_CHUNK", "512"))  # 서비스 요청 1회당 최대 텍스트 수
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "true").lower() == 'true'
+QUERY_TIMEOUT = float(os.getenv("EMBED_QUERY_TIMEOUT", "10"))
+MAX_QUERY_CHARS = 512
+
+
+def length_buckets(texts: List[str], batch_size: int) -> List[List[int]]:
+    """텍스트를 길이 내림차순으로 정렬한 뒤 batch_size 단위로 나눈 인덱스 묶음을 반환합니다."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def encode_batched(model, texts: List[str], batch_size: Optional[int] = None,
+                   normalize: bool = True, label: str = "encode") -> np.ndarray:
+    """texts를 길이별 배치로 인코딩하여 (len(texts), dim) float32 배열을 입력 순서대로 반환합니다."""
+    batch_size = batch_size or ENCODE_BATCH_SIZE
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    buckets = length_buckets(texts, batch_size)
+    result: Optional[np.ndarray] = None
+    started = time.perf_counter()
+    for number, indices in enumerate(buckets, start=1):
+        batch_started = time.perf_counter()
+        vecs = model.encode([texts[i] for i in indices], batch_size=len(indices),
+                            normalize_embeddings=normalize, convert_to_numpy=True, show_progress_bar=False)
+        elapsed = time.perf_counter() - batch_started
+        if result is None:
+            result = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        result[indices] = vecs
+        logging.info(f"[{label}] batch {number}/{len(buckets)}: {len(indices)} texts "
+                     f"(max {len(texts[indices[0]])} chars) in {elapsed:.2f}s, {len(indices) / max(elapsed, 1e-9):.1f} texts/sec")
+
+    total = time.perf_counter() - started
+    logging.info(f"[{label}] Encoded {len(texts)} texts in {total:.2f}s ({len(texts) / max(total, 1e-9):.1f} texts/sec, batch size {batch_size}).")
+    return result
+
+
+# --- 프로세스 내 모델 (서비스를 쓸 수 없을 때의 fallback) ---
+_MODEL = None
+_service_down = False
+
+
+def get_local_model(threads: int = 0):
+    """threads는 onnx 세션의 intra-op 스레드 수 (0이면 기본값). torch는 torch.set_num_threads로 조절."""
+    global _MODEL
+    if _MODEL is None:
+        logging.info(f"Loading embedding model in-process: {MODEL_NAME} (backend: {EMBED_BACKEND})...")
+        if EMBED_BACKEND == 'onnx':
+            from onnx_encoder import OnnxEncoder
+            _MODEL = OnnxEncoder(MODEL_NAME, threads=threads)
+        else:
+            # torch/sentence_transformers import 자체가 수 초 걸리므로 실제로 필요할 때만 import
+            from sentence_transformers import SentenceTransformer
+            _MODEL = SentenceTransformer(MODEL_NAME)
+        logging.info("Model loaded.")
+    return _MODEL
+
+
+def release_local_model() -> None:
+    global _MODEL
+    if _MODEL is not None:
+        _MODEL = None
+        gc.collect()
+
+
+# --- 임베딩 서비스 클라이언트 ---
+def _encode_remote(texts: List[str]) -> Optional[np.ndarray]:
+    """embedding_server.py로 인코딩합니다. 서비스에 연결할 수 없으면 None을 반환합니다."""
+    global _service_down
+    if not EMBED_SERVICE_URL or _service_down:
+        return None
+    import requests
+
+    parts = []
+    try:
+        for start in range(0, len(texts), EMBED_CLIENT_CHUNK):
+            chunk = texts[start:start + EMBED_CLIENT_CHUNK]
+            response = requests.post(
+                f"{EMBED_SERVICE_URL}/encode",
+                data=json.dumps({"texts": chunk, "model": model_key()}, ensure_ascii=False).encode('utf-8'),
+                headers={"Content-Type": "application/json"},
+                timeout=EMBED_SERVICE_TIMEOUT,
+            )
+            response.raise_for_status()
+            dim = int(response.headers["X-Embedding-Dim"])
+            parts.append(np.frombuffer(response.content, dtype='<f4').reshape(len(chunk), dim))
+    except (requests.RequestException, KeyError, ValueError) as e:
+        # 서비스가 없거나 다른 모델/백엔드를 서빙 중이면(409) 이번 프로세스에서는 다시 시도하지 않음
+        logging.warning(f"Embedding service unavailable at {EMBED_SERVICE_URL} ({e}); encoding in-process.")
+        _service_down = True
+        return None
+    return np.concatenate(parts).astype(np.float32, copy=False)
+
+
+# --- 임베딩 캐시 ---
+_cache: Optional[EmbeddingCache] = None
+
+
+def model_key() -> str:
+    """캐시된 벡터를 구분하는 모델 이름. int8 벡터는 fp32 벡터와 미세하게 다르므로 백엔드별로 분리합니다."""
+    return MODEL_NAME if EMBED_BACKEND == 'torch' else f"{MODEL_NAME}@{EMBED_BACKEND}"
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _cache
+    if _cache is None and EMBED_CACHE_ENABLED:
+        _cache = EmbeddingCache(model_key())
+    return _cache
+
+
+def encode_with_cache(texts: List[str], encoder: Callable[[List[str]], np.ndarray], label: str = "encode") -> np.ndarray:
+    """
+    텍스트를 정규화한 뒤 캐시에 있는 벡터는 그대로 쓰고, 없는 텍스트만 (중복 제거 후) encoder로 인코딩하여
+    캐시에 추가합니다. 결과는 입력 순서대로 반환합니다.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    cache = get_embedding_cache()
+    if cache is None:
+        return encoder(normalized)
+
+    keys = [cache.key(t) for t in normalized]
+    found, missing = cache.lookup(keys)
+    pending = {}  # key -> 입력 내 위치 목록 (통신사 기사처럼 같은 텍스트는 한 번만 인코딩)
+    for position in missing:
+        pending.setdefault(keys[position], []).append(position)
+    if pending:
+        unique_keys = list(pending)
+        vecs = encoder([normalized[pending[key][0]] for key in unique_keys])
+        cache.add(unique_keys, vecs)
+        for key, vec in zip(unique_keys, vecs):
+            for position in pending[key]:
+                found[position] = vec
+    logging.info(f"[{label}] Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits, "
+                 f"{len(pending)} texts encoded.")
+    return np.stack([found[i] for i in range(len(texts))]).astype(np.float32, copy=False)
+
+
+def _encode_uncached(texts: List[str], label: str) -> np.ndarray:
+    started = time.perf_counter()
+    vecs = _encode_remote(texts)
+    if vecs is not None:
+        elapsed = time.perf_counter() - started
+        logging.info(f"[{label}] Encoded {len(texts)} texts via embedding service in {elapsed:.2f}s "
+                     f"({len(texts) / max(elapsed, 1e-9):.1f} texts/sec).")
+        return vecs
+    return encode_batched(get_local_model(), texts, label=label)
+
+
+def encode_texts(texts: List[str], label: str = "encode") -> np.ndarray:
+    """정규화된 임베딩을 (len(texts), dim) float32 배열로 반환합니다. 캐시 → 서비스 → 프로세스 내 모델 순으로 사용합니다."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return encode_with_cache(texts, lambda missing: _encode_uncached(missing, label), label=label)
+
+def normalize_query(query: str) -> str:
+    """검색어 캐시 키: 공백을 정리하고 길이를 제한합니다."""
+    return " ".join(query.split())[:MAX_QUERY_CHARS]
+
+
+def encode_query(query: str) -> np.ndarray:
+    """검색어 하나의 임베딩을 반환합니다. 서비스의 /query(LRU 캐시)를 우선 사용합니다."""
+    global _service_down
+    query = normalize_query(query)
+    if EMBED_SERVICE_URL and not _service_down:
+        import requests
+        try:
+            response = requests.get(f"{EMBED_SERVICE_URL}/query", params={"q": query, "model": model_key()}, timeout=QUERY_TIMEOUT)
+            response.raise_for_status()
+            return np.frombuffer(response.content, dtype='<f4').astype(np.float32)
+        except requests.RequestException as e:
+            logging.warning(f"Embedding service unavailable at {EMBED_SERVICE_URL} ({e}); encoding in-process.")
+            _service_down = True
+    return encode_texts([f"query: {query}"], label="query")[0]
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+encoding_pool.py
+- Multi-process encoding for large backfills (daily_vectorizer.py --workers N|auto).
+- torch backend: the model is loaded once in the parent and the workers are forked from it, so every
+  worker maps the same (copy-on-write) weight pages instead of holding its own copy.
+- onnx backend: an ONNX Runtime session is not fork-safe (its thread pool would be copied mid-state),
+  so the parent never creates one; the workers are spawned and each builds its own session in the
+  initializer. The int8 model is small enough that the extra copies are cheap.
+- Each worker runs encode_batched() with cores / N intra-op threads (torch.set_num_threads, or the
+  session's intra_op_num_threads for onnx).
+- Texts are sorted into length buckets first, the buckets are dealt to the workers as shards and
+  the shard results are merged back in input order.
+- All workers are started in the constructor, before the caller starts any threads (daily_vectorizer
+  --drain/--lease), so no worker is forked from a multi-threaded process.
+- On platforms without fork (Windows) the workers are always spawned and load their own model.
+- Usage:
+    python encoding_pool.py --bench [--max-workers N] [--texts 2000]   # throughput for 1..N workers
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from embedding_utils import EMBED_BACKEND, ENCODE_BATCH_SIZE, encode_batched, get_local_model, length_buckets
+
+ENCODE_WORKERS = os.getenv("ENCODE_WORKERS", "1")  # 1 | N | auto
+WORKER_MEMORY_MB = int(os.getenv("ENCODE_WORKER_MEMORY_MB", "1024"))  # 워커 1개당 활성화 메모리 추정치
+MIN_THREADS_PER_WORKER = int(os.getenv("ENCODE_MIN_THREADS_PER_WORKER", "2"))
+SHARD_BATCHES = int(os.getenv("ENCODE_SHARD_BATCHES", "4"))  # 워커에 한 번에 넘기는 배치 수
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory_mb() -> Optional[int]:
+    """사용 가능한 메모리(MB). 알 수 없으면 None."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def auto_workers() -> int:
+    """코어 수(워커당 최소 MIN_THREADS_PER_WORKER 스레드)와 여유 메모리로 워커 수를 정합니다."""
+    by_cores = max(1, cpu_count() // MIN_THREADS_PER_WORKER)
+    memory = available_memory_mb()
+    by_memory = max(1, memory // WORKER_MEMORY_MB) if memory else by_cores
+    return min(by_cores, by_memory)
+
+
+def resolve_workers(value: str = ENCODE_WORKERS) -> int:
+    if str(value).lower() == 'auto':
+        return auto_workers()
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logging.warning(f"Invalid worker count {value!r}; using 1.")
+        return 1
+
+
+# --- 워커 프로세스 ---
+def _init_worker(threads: int) -> None:
+    if EMBED_BACKEND == 'onnx':
+        # spawn된 워커에서 세션을 새로 만들고 스레드 수를 코어/N으로 제한 (기본값이면 워커마다 모든 코어를 씀)
+        get_local_model(threads=threads)
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _encode_shard(shard: Tuple[int, List[str]]) -> Tuple[int, np.ndarray]:
+    number, texts = shard
+    # fork로 시작한 워커는 부모가 로드한 모델을, spawn된 워커는 initializer에서 만든 모델을 사용
+    return number, encode_batched(get_local_model(), texts, label=f"worker {os.getpid()}")
+
+
+class EncodingPool:
+    """length bucket 단위 shard를 여러 프로세스에 나눠 인코딩하고 입력 순서대로 합칩니다."""
+
+    def __init__(self, workers: int, batch_size: int = ENCODE_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.threads = max(1, cpu_count() // workers)
+        methods = multiprocessing.get_all_start_methods()
+        if 'fork' in methods and EMBED_BACKEND != 'onnx':
+            get_local_model()  # 포크 전에 로드해야 워커들이 같은 가중치 페이지를 공유함
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context('spawn')
+        logging.info(f"Starting encoding pool: {workers} workers x {self.threads} threads ({context.get_start_method()}).")
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                             initializer=_init_worker, initargs=(self.threads,))
+        # ProcessPoolExecutor는 첫 작업 때 워커를 fork하므로, 호출한 쪽(drain)이 스레드와 DB 연결을 만들기 전에
+        # 지금 모든 워커를 띄워 둠 (스레드가 잡고 있던 lock을 복사한 자식이 멈추는 문제 방지)
+        for future in [self._executor.submit(_ready) for _ in range(workers)]:
+            future.result()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        buckets = length_buckets(texts, self.batch_size)
+        # 길이가 비슷한 배치를 묶어 shard로 만들고, 긴 shard부터 제출해 워커 간 부하를 맞춤
+        shards = [sum(buckets[start:start + SHARD_BATCHES], []) for start in range(0, len(buckets), SHARD_BATCHES)]
+        started = time.perf_counter()
+        result: Optional[np.ndarray] = None
+        for number, vecs in self._executor.map(_encode_shard, [(n, [texts[i] for i in shard]) for n, shard in enumerate(shards)]):
+            if result is None:
+                result = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            result[shards[number]] = vecs
+        elapsed = time.perf_counter() - started
+        logging.info(f"[pool] Encoded {len(texts)} texts with {self.workers} workers in {elapsed:.2f}s "
+                     f"({len(texts) / max(elapsed, 1e-9):.1f} texts/sec).")
+        return result
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self) -> "EncodingPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- 벤치마크 ---
+def bench(max_workers: int, count: int) -> int:
+    from onnx_encoder import load_parity_corpus
+
+    corpus = load_parity_corpus()
+    texts = [corpus[i % len(corpus)] for i in range(count)]
+    print(f"Corpus: {len(texts)} passages, {cpu_count()} cores, {available_memory_mb()} MB available, auto workers: {auto_workers()}")
+    print(f"{'workers':>7} {'threads':>7} {'texts/sec':>10} {'speedup':>8} {'efficiency':>10}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        with EncodingPool(workers) as pool:
+            pool.encode(texts[:pool.batch_size * workers])  # 워커 예열
+            started = time.perf_counter()
+            pool.encode(texts)
+            rate = len(texts) / (time.perf_counter() - started)
+        baseline = baseline or rate
+        print(f"{workers:>7} {pool.threads:>7} {rate:>10.1f} {rate / baseline:>7.2f}x {rate / baseline / workers:>9.0%}")
+    return 0
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Multi-process encoding pool")
+    parser.add_argument('--bench', action='store_true', help="measure throughput for 1..N workers")
+    parser.add_argument('--max-workers', type=int, default=0, help="largest pool to benchmark (default: auto)")
+    parser.add_argument('--texts', type=int, default=2000, help="number of passages to encode per run")
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        return 0
+    return bench(args.max_workers or auto_workers(), args.texts)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
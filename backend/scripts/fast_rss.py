@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fast_rss.py
+- Lightweight incremental parser for the plain RSS 2.0 feeds listed in rss_collector.FEEDS.
+- Works directly on the response bytes with ElementTree.iterparse and keeps only the fields
+  the collector uses: title, link, description, pubDate/dc:date and media:thumbnail/media:content.
+- Finished <item> elements are cleared as soon as they are read.
+- Entries are returned as FeedEntry objects that behave like feedparser's entries
+  (item.get('link'), item.title, item.media_thumbnail[0].get('url'), ...).
+- Returns None for anything that is not RSS 2.0 (Atom, RDF, unsupported encodings, broken XML),
+  so the caller can fall back to feedparser.
+"""
+
+import io
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import xml.etree.ElementTree as ET
+
+MEDIA_NS = "{http://search.yahoo.com/mrss/}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+_TEXT_FIELDS = {
+    'title': 'title',
+    'link': 'link',
+    'description': 'description',
+    'pubDate': 'published',
+    f'{DC_NS}date': 'updated',  # feedparser와 마찬가지로 dc:date는 updated로 노출
+}
+
+
+class FeedEntry(dict):
+    """feedparser의 FeedParserDict처럼 키를 속성으로도 읽을 수 있는 dict."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _parse_date(value: str):
+    """RFC 822(pubDate) 또는 W3C(dc:date) 날짜를 UTC struct_time으로 변환합니다."""
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if dt is None or dt.tzinfo is None:
+        # 시간대가 없는 날짜는 rss_collector의 KST 처리에 맡김
+        return None
+    return dt.astimezone(timezone.utc).timetuple()
+
+
+def _finish_entry(entry: FeedEntry) -> FeedEntry:
+    if 'description' in entry:
+        entry['summary'] = entry['description']
+    for key in ('published', 'updated'):
+        if entry.get(key):
+            parsed = _parse_date(entry[key])
+            if parsed is not None:
+                entry[f'{key}_parsed'] = parsed
+    if 'updated' in entry:
+        entry['dc_date'] = entry['updated']
+    return entry
+
+
+def parse_rss(body: bytes) -> Optional[List[FeedEntry]]:
+    """RSS 2.0 본문을 파싱하여 항목 목록을 반환합니다. 지원하지 않는 형식이면 None을 반환합니다."""
+    entries: List[FeedEntry] = []
+    current: Optional[FeedEntry] = None
+    root_checked = False
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(body), events=('start', 'end')):
+            if not root_checked:
+                root_checked = True
+                if elem.tag != 'rss':
+                    return None
+                continue
+            tag = elem.tag
+            if event == 'start':
+                if tag == 'item':
+                    current = FeedEntry()
+                continue
+
+            if tag == 'item':
+                if current is not None:
+                    entries.append(_finish_entry(current))
+                current = None
+                elem.clear()
+            elif current is not None:
+                field = _TEXT_FIELDS.get(tag)
+                if field is not None:
+                    current.setdefault(field, (elem.text or '').strip())
+                elif tag == f'{MEDIA_NS}thumbnail':
+                    current.setdefault('media_thumbnail', []).append(dict(elem.attrib))
+                elif tag == f'{MEDIA_NS}content':
+                    current.setdefault('media_content', []).append(dict(elem.attrib))
+    except (ET.ParseError, ValueError, LookupError):
+        # 깨진 XML이나 expat이 지원하지 않는 인코딩(EUC-KR 등)은 feedparser로 넘김
+        return None
+    return entries if root_checked else None
+
+
+def entry_fields(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """파서 간 비교(벤치마크 검증)에 쓰는 공통 필드만 뽑아냅니다."""
+    thumbnails = entry.get('media_thumbnail') or []
+    contents = entry.get('media_content') or []
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return {
+        'title': (entry.get('title') or '').strip(),
+        'link': (entry.get('link') or '').strip(),
+        'published_parsed': tuple(parsed[:6]) if parsed else None,
+        'thumbnail': thumbnails[0].get('url') if thumbnails else None,
+        'media_images': [m.get('url') for m in contents if m.get('medium') == 'image'],
+    }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+feed_scheduler.py
+- Tracks, per RSS feed, the rate of new items, the last time it changed and recent failures.
+- Gives every feed its own adaptive polling interval: busy feeds (e.g. 연합뉴스 정치) are polled
+  more often, idle or failing feeds back off.
+- State is persisted as JSON so rss_collector.py (--due-only) and continuous_vectorizer.py share it.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+SCHEDULE_PATH = os.getenv("FEED_SCHEDULE_PATH", os.path.join(os.path.dirname(__file__), 'feed_schedule.json'))
+BASE_INTERVAL = int(os.getenv("FEED_BASE_INTERVAL", str(15 * 60)))  # 처음 보는 피드의 주기 (기존 고정 주기)
+MIN_INTERVAL = int(os.getenv("FEED_MIN_INTERVAL", str(2 * 60)))
+MAX_INTERVAL = int(os.getenv("FEED_MAX_INTERVAL", str(60 * 60)))
+TARGET_NEW_ITEMS = float(os.getenv("FEED_TARGET_NEW_ITEMS", "3"))  # 한 번 폴링할 때 기대하는 새 기사 수
+RATE_SMOOTHING = 0.3  # 새 기사 비율 EWMA 가중치
+IDLE_BACKOFF = 1.5    # 새 기사가 없을 때 주기 증가 배수
+MAX_FAILURE_SHIFT = 6
+
+
+def _clamp(value: float) -> float:
+    return max(MIN_INTERVAL, min(MAX_INTERVAL, value))
+
+
+class FeedScheduler:
+    """피드 URL별 폴링 상태를 관리합니다."""
+
+    def __init__(self, path: str = SCHEDULE_PATH):
+        self.path = path
+        self.state: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> "FeedScheduler":
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"[FeedScheduler] Failed to load {self.path}, starting empty: {e}")
+            self.state = {}
+        return self
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"[FeedScheduler] Failed to save {self.path}: {e}")
+
+    def due_feeds(self, feeds: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """지금 폴링할 차례인 피드만 반환합니다. 처음 보는 피드는 항상 포함됩니다."""
+        now = time.time() if now is None else now
+        return [feed for feed in feeds if self.state.get(feed['url'], {}).get('next_due', 0) <= now]
+
+    def seconds_until_next_due(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        if not self.state:
+            return 0.0
+        return max(0.0, min(entry.get('next_due', 0) for entry in self.state.values()) - now)
+
+    def record(self, feed_url: str, new_items: int, failed: bool = False, now: Optional[float] = None) -> float:
+        """폴링 결과를 반영하여 다음 폴링 시각을 정하고, 새 주기(초)를 반환합니다."""
+        now = time.time() if now is None else now
+        entry = self.state.setdefault(feed_url, {
+            'interval': BASE_INTERVAL,
+            'rate': 0.0,          # 분당 새 기사 수 (EWMA)
+            'failures': 0,
+            'last_polled': None,
+            'last_change': None,
+        })
+
+        if failed:
+            entry['failures'] += 1
+            interval = BASE_INTERVAL * (2 ** min(entry['failures'], MAX_FAILURE_SHIFT))
+        else:
+            entry['failures'] = 0
+            elapsed = now - entry['last_polled'] if entry['last_polled'] else entry['interval']
+            observed_rate = new_items / max(elapsed / 60.0, 1.0 / 60.0)
+            if entry['last_polled'] is None:
+                entry['rate'] = observed_rate
+            else:
+                entry['rate'] = RATE_SMOOTHING * observed_rate + (1 - RATE_SMOOTHING) * entry['rate']
+            if new_items:
+                entry['last_change'] = now
+                interval = TARGET_NEW_ITEMS / entry['rate'] * 60.0
+            else:
+                interval = entry['interval'] * IDLE_BACKOFF
+
+        interval = _clamp(interval)
+        entry['interval'] = interval
+        entry['last_polled'] = now
+        entry['next_due'] = now + interval
+        return interval
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+notification_dispatcher.py
+- Queues breaking/exclusive news notifications and delivers them off the collector's critical path.
+- A background thread drains the queue and POSTs batches to the internal
+  /api/internal/send-notifications endpoint over one pooled requests.Session.
+- Failed batches are retried a bounded number of times with backoff, then dropped and logged.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NOTIFICATION_BATCH_API_URL = os.getenv(
+    "INTERNAL_NOTIFICATION_BATCH_API_URL", "http://127.0.0.1:4001/api/internal/send-notifications"
+)
+INTERNAL_API_SECRET = os.getenv("INTERNAL_API_SECRET", "")
+BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "20"))
+FLUSH_INTERVAL = float(os.getenv("NOTIFICATION_FLUSH_INTERVAL", "1.0"))  # 배치를 모으는 최대 대기 시간(초)
+MAX_RETRIES = int(os.getenv("NOTIFICATION_MAX_RETRIES", "3"))
+REQUEST_TIMEOUT = float(os.getenv("NOTIFICATION_TIMEOUT", "5"))
+RETRY_BACKOFF = 0.5
+
+_STOP = object()
+
+
+def build_payload(notification_type: str, article: Dict[str, Any]) -> Dict[str, Any]:
+    published_at = article.get('published_at')
+    return {
+        "notification_type": notification_type,
+        "data": {
+            "title": article.get('title'),
+            "url": article.get('url'),
+            "source": article.get('source'),
+            "source_domain": article.get('source_domain'),
+            "thumbnail_url": article.get('thumbnail_url'),
+            "published_at": published_at.isoformat() if published_at else None,
+        }
+    }
+
+
+class NotificationDispatcher:
+    """알림을 큐에 쌓고 백그라운드 스레드에서 배치로 전송합니다."""
+
+    def __init__(self, url: str = NOTIFICATION_BATCH_API_URL, secret: str = INTERNAL_API_SECRET,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_retries: int = MAX_RETRIES, timeout: float = REQUEST_TIMEOUT):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.sent = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.headers.update({"x-internal-secret": secret})
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+
+    def start(self) -> "NotificationDispatcher":
+        self._thread.start()
+        return self
+
+    def enqueue(self, notification_type: str, article: Dict[str, Any]) -> None:
+        self._queue.put(build_payload(notification_type, article))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """남은 알림을 모두 전송하고 스레드를 종료합니다. timeout이 지나면 기다리지 않고 반환합니다."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning("[Notification] Dispatcher did not finish within timeout; pending notifications may be lost.")
+        self._session.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch: List[Dict[str, Any]] = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._send(batch)
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._session.post(self.url, json={"notifications": batch}, timeout=self.timeout)
+                if response.status_code < 500 and response.status_code != 429:
+                    response.raise_for_status()
+                    self.sent += len(batch)
+                    logging.info(f"[Notification] Sent batch of {len(batch)} notifications.")
+                    return
+                error: Exception = requests.HTTPError(f"HTTP {response.status_code}")
+            except requests.HTTPError as e:
+                # 4xx(인증 실패, 잘못된 요청)는 재시도해도 결과가 같으므로 바로 포기
+                logging.error(f"[Notification] Batch rejected: {e}")
+                break
+            except requests.RequestException as e:
+                error = e
+            if attempt < self.max_retries:
+                time.sleep(RETRY_BACKOFF * (2 ** attempt))
+        else:
+            logging.error(f"[Notification] Giving up on batch of {len(batch)} after {self.max_retries + 1} attempts: {error}")
+        self.dropped += len(batch)
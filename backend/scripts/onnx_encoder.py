@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+onnx_encoder.py
+- Optional CPU inference backend for the e5 encoder (EMBED_BACKEND=onnx).
+- Exports the transformer to ONNX once, applies dynamic int8 quantization and runs it through
+  ONNX Runtime with tuned intra-op threads. Mean pooling + L2 normalization (the e5 pooling) is done in numpy.
+- OnnxEncoder exposes the subset of the SentenceTransformer API that embedding_utils uses
+  (encode, get_sentence_embedding_dimension), so it drops into encode_batched() unchanged.
+- Needs `pip install onnxruntime onnx` (and torch/transformers for the one-time export).
+- Usage:
+    python onnx_encoder.py --export     # export + quantize into EMBED_ONNX_DIR
+    python onnx_encoder.py --parity     # cosine deviation vs. the fp32 SentenceTransformer on a sample corpus
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+from typing import List, Union
+
+import numpy as np
+
+from embedding_utils import MODEL_NAME, ENCODE_BATCH_SIZE
+
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", os.path.join(os.path.dirname(__file__), 'onnx_models'))
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))  # 0이면 물리 코어 수
+MAX_SEQ_LENGTH = 512
+ONNX_OPSET = 17
+PARITY_MIN_COSINE = float(os.getenv("EMBED_PARITY_MIN_COSINE", "0.98"))
+PARITY_CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'feeds')
+
+
+def model_dir(model_name: str = MODEL_NAME) -> str:
+    return os.path.join(EMBED_ONNX_DIR, re.sub(r'[^A-Za-z0-9._-]+', '_', model_name))
+
+
+def export_quantized(model_name: str = MODEL_NAME) -> str:
+    """모델을 ONNX로 내보내고 동적 int8 양자화를 적용합니다. 양자화된 모델 경로를 반환합니다."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir = model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, 'model.onnx')
+    int8_path = os.path.join(out_dir, 'model.int8.onnx')
+
+    logging.info(f"Exporting {model_name} to ONNX ({fp32_path})...")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    sample = tokenizer(["passage: 예시 문장입니다."], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(model), (sample["input_ids"], sample["attention_mask"]), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+    logging.info(f"Quantizing to int8 ({int8_path})...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(out_dir)
+    return int8_path
+
+
+class OnnxEncoder:
+    """SentenceTransformer 대신 사용할 수 있는 ONNX Runtime int8 인코더."""
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = 0):
+        """threads: intra-op 스레드 수. 0이면 ORT_INTRA_OP_THREADS (그것도 0이면 ORT 기본값 = 물리 코어 수)."""
+        import onnxruntime as ort
+
+        threads = threads or ORT_INTRA_OP_THREADS
+        from transformers import AutoTokenizer
+
+        path = os.path.join(model_dir(model_name), 'model.int8.onnx')
+        if not os.path.exists(path):
+            path = export_quantized(model_name)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir(model_name))
+        self.max_seq_length = MAX_SEQ_LENGTH
+        self._dim = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = int(self.encode(["passage: "]).shape[1])
+        return self._dim
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = ENCODE_BATCH_SIZE,
+               normalize_embeddings: bool = False, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            mask = tokens["attention_mask"].astype(np.int64)
+            hidden = self.session.run(None, {"input_ids": tokens["input_ids"].astype(np.int64), "attention_mask": mask})[0]
+            # e5 모델의 pooling: attention mask 기준 mean pooling
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            outputs.append(pooled.astype(np.float32))
+        vecs = np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(vecs):
+            vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+        return vecs[0] if single else vecs
+
+
+def load_parity_corpus() -> List[str]:
+    """fixtures/feeds의 기사 제목/요약을 daily_vectorizer와 같은 형식의 passage로 만듭니다."""
+    from fast_rss import parse_rss
+
+    texts = []
+    for name in sorted(os.listdir(PARITY_CORPUS_DIR)):
+        with open(os.path.join(PARITY_CORPUS_DIR, name), 'rb') as f:
+            for entry in parse_rss(f.read()) or []:
+                description = re.sub(r'<[^>]+>', ' ', entry.get('description', ''))
+                texts.append(f"passage: {entry.get('title', '')} {description}"[:1024])
+    return texts
+
+
+def parity_check() -> int:
+    from sentence_transformers import SentenceTransformer
+
+    texts = load_parity_corpus()
+    print(f"Parity corpus: {len(texts)} passages from {PARITY_CORPUS_DIR}")
+
+    reference = SentenceTransformer(MODEL_NAME)
+    started = time.perf_counter()
+    expected = reference.encode(texts, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True)
+    torch_seconds = time.perf_counter() - started
+
+    encoder = OnnxEncoder(MODEL_NAME)
+    started = time.perf_counter()
+    actual = encoder.encode(texts, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True)
+    onnx_seconds = time.perf_counter() - started
+
+    cosines = np.sum(expected * actual, axis=1)
+    print(f"fp32 torch: {len(texts) / torch_seconds:.1f} texts/sec, onnx int8: {len(texts) / onnx_seconds:.1f} texts/sec "
+          f"({torch_seconds / onnx_seconds:.2f}x)")
+    print(f"cosine(fp32, int8): mean {cosines.mean():.5f}, p1 {np.percentile(cosines, 1):.5f}, min {cosines.min():.5f}")
+    if cosines.min() < PARITY_MIN_COSINE:
+        print(f"FAILURE: minimum cosine {cosines.min():.5f} is below {PARITY_MIN_COSINE}.")
+        return 1
+    print("SUCCESS: int8 ONNX embeddings match the fp32 model.")
+    return 0
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="ONNX Runtime int8 backend for the embedding model")
+    parser.add_argument('--export', action='store_true', help="export and quantize the model")
+    parser.add_argument('--parity', action='store_true', help="compare int8 ONNX output with the fp32 model")
+    args = parser.parse_args()
+    if args.export:
+        print(export_quantized(MODEL_NAME))
+    if args.parity:
+        return parity_check()
+    if not (args.export or args.parity):
+        parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,23 +11,29 @@ import re
 import sys
 import time
 import html
+import json
+import struct
+import hashlib
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, List, Any
+from dataclasses import dataclass, field
+from collections import Counter
+from typing import Optional, Dict, List, Any, Tuple, Set
+from array import array
 import feedparser
 import pymysql
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
 from dotenv import load_dotenv
-import concurrent.futures
 from dateutil.parser import parse as dt_parse
-import threading
 import calendar
+import asyncio
+import aiohttp
 
-# requests.Session의 고급 설정을 위한 import
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from feed_scheduler import FeedScheduler
+from collector_metrics import CollectorMetrics, FeedMetrics
+from notification_dispatcher import NotificationDispatcher
+from fast_rss import parse_rss
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
@@ -37,6 +43,10 @@ LOG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'logs')
 LOG_FILE_PATH = os.path.join(LOG_DIR, 'home_collector.log')
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
+# 수집 지표 출력 위치 (Prometheus textfile, JSONL 이력)
+METRICS_PROM_PATH = os.getenv("COLLECTOR_METRICS_PROM_PATH", os.path.join(LOG_DIR, 'rss_collector.prom'))
+METRICS_HISTORY_PATH = os.getenv("COLLECTOR_METRICS_HISTORY_PATH", os.path.join(LOG_DIR, 'collector_metrics.jsonl'))
+
 # 로그 디렉토리 생성 (없는 경우)
 os.makedirs(LOG_DIR, exist_ok=True)
 
@@ -68,7 +78,9 @@ DB_CONFIG = {
     "database": os.getenv("DB_DATABASE"),
 }
 
-INTERNAL_API_URL = os.getenv("INTERNAL_NOTIFICATION_API_URL", "http://127.0.0.1:4001/api/internal/send-notification")
+# 속보/단독 기사 실시간 알림 (기본 비활성화)
+ENABLE_BREAKING_NOTIFICATIONS = os.getenv("ENABLE_BREAKING_NOTIFICATIONS", "false").lower() == 'true'
+NOTIFICATION_CLOSE_TIMEOUT = float(os.getenv("NOTIFICATION_CLOSE_TIMEOUT", "15"))
 
 if 'tidbcloud.com' in DB_CONFIG.get('host', '') or os.getenv("DB_SSL_ENABLED") == 'true':
     # TiDB Cloud requires SSL or explicit non-verification for some clients
@@ -76,6 +88,9 @@ if 'tidbcloud.com' in DB_CONFIG.get('host', '') or os.getenv("DB_SSL_ENABLED") =
 
 KST = timezone(timedelta(hours=9))
 
+# 피드별 조건부 요청 검증값(ETag, Last-Modified, 본문 해시) 저장 위치
+FEED_CACHE_PATH = os.getenv("FEED_CACHE_PATH", os.path.join(os.path.dirname(__file__), 'feed_cache.json'))
+
 FEEDS: List[Dict[str, Any]] = [
     # LEFT
     {'source': "경향신문", 'source_domain': "khan.co.kr", 'side': "LEFT", 'url': "https://www.khan.co.kr/rss/rssdata/politic_news.xml", 'section': "정치"},
@@ -126,24 +141,238 @@ FEEDS: List[Dict[str, Any]] = [
     {'source': "동아일보", 'source_domain': "donga.com", 'side': "RIGHT", 'url': "https://rss.donga.com/sports.xml", 'section': "스포츠"},
 ]
 
-# --- 고급 HTTP 세션 설정 ---
-retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
-_session_local = threading.local()
-
-def _create_session() -> requests.Session:
-    session = requests.Session()
-    session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"})
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
-
-def get_http_session() -> requests.Session:
-    session = getattr(_session_local, "session", None)
-    if session is None:
-        session = _create_session()
-        _session_local.session = session
-    return session
+# --- 비동기 HTTP 엔진 설정 ---
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+COLLECTOR_MAX_CONNECTIONS = int(os.getenv("COLLECTOR_MAX_CONNECTIONS", "50"))  # 전체 커넥션 풀 크기
+COLLECTOR_PER_DOMAIN_LIMIT = int(os.getenv("COLLECTOR_PER_DOMAIN_LIMIT", "4"))  # source_domain별 동시 요청 수
+FEED_TIMEOUT = float(os.getenv("COLLECTOR_FEED_TIMEOUT", "15"))
+PAGE_TIMEOUT = float(os.getenv("COLLECTOR_PAGE_TIMEOUT", "8"))
+PAGE_HEAD_MAX_BYTES = int(os.getenv("COLLECTOR_PAGE_HEAD_MAX_BYTES", str(64 * 1024)))  # head-only 요청 시 최대 수신 바이트
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+COLLECTOR_FAST_RSS = os.getenv("COLLECTOR_FAST_RSS", "true").lower() == 'true'  # RSS 2.0 피드는 경량 파서로 처리
+
+@dataclass
+class CollectStats:
+    skipped_feeds: int = 0  # 변경이 없어 파싱을 건너뛴 피드 수
+    known_items: int = 0    # 이미 저장되어 있어 스크랩 없이 건너뛴 기사 수
+    failed_feeds: Set[str] = field(default_factory=set)  # 수집에 실패한 피드 URL
+    metrics: CollectorMetrics = field(default_factory=CollectorMetrics)
+
+@dataclass
+class FetchResult:
+    status: int
+    url: str
+    headers: Dict[str, str]  # 헤더 이름은 소문자로 정규화
+    body: bytes
+
+class CollectorEngine:
+    """하나의 커넥션 풀을 공유하면서 source_domain별 동시 요청 수를 제한하는 HTTP 엔진."""
+
+    def __init__(self, session: aiohttp.ClientSession, per_domain_limit: int = COLLECTOR_PER_DOMAIN_LIMIT):
+        self.session = session
+        self.per_domain_limit = per_domain_limit
+        self._domain_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, domain: str) -> asyncio.Semaphore:
+        semaphore = self._domain_semaphores.get(domain)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_domain_limit)
+            self._domain_semaphores[domain] = semaphore
+        return semaphore
+
+    async def fetch(self, url: str, domain: str, timeout: float, headers: Optional[Dict[str, str]] = None,
+                    method: str = 'GET', head_only: bool = False) -> FetchResult:
+        """head_only=True이면 본문을 </head>까지(최대 PAGE_HEAD_MAX_BYTES)만 읽고 연결을 끊습니다."""
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        for attempt in range(HTTP_RETRIES + 1):
+            try:
+                async with self._semaphore(domain):
+                    async with self.session.request(method, url, headers=headers, timeout=client_timeout, allow_redirects=True) as response:
+                        if method == 'HEAD':
+                            body = b''
+                        elif head_only:
+                            body = await _read_until_head_end(response)
+                        else:
+                            body = await response.read()
+                        result = FetchResult(
+                            status=response.status,
+                            url=str(response.url),
+                            headers={k.lower(): v for k, v in response.headers.items()},
+                            body=body,
+                        )
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == HTTP_RETRIES:
+                    raise
+            else:
+                if result.status not in RETRY_STATUSES or attempt == HTTP_RETRIES:
+                    return result
+            await asyncio.sleep(HTTP_BACKOFF * (2 ** attempt))
+
+async def _read_until_head_end(response: aiohttp.ClientResponse) -> bytes:
+    # 남은 본문을 읽지 않고 나가면 aiohttp가 해당 연결을 재사용하지 않고 닫음
+    buffer = bytearray()
+    async for chunk in response.content.iter_chunked(8192):
+        search_from = max(0, len(buffer) - 6)
+        buffer.extend(chunk)
+        if b'</head' in bytes(buffer[search_from:]).lower() or len(buffer) >= PAGE_HEAD_MAX_BYTES:
+            break
+    return bytes(buffer[:PAGE_HEAD_MAX_BYTES])
+
+def create_http_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(limit=COLLECTOR_MAX_CONNECTIONS, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+
+# --- 피드 검증값 캐시 ---
+# 이전 실행에서 받은 ETag/Last-Modified/본문 해시를 피드 URL별로 보관하여
+# 변경되지 않은 피드는 304 응답이나 해시 일치로 파싱을 건너뜁니다.
+# 새 검증값은 DB 저장이 성공한 뒤에만 반영하여, 실패한 실행의 기사가 유실되지 않도록 합니다.
+_feed_cache: Dict[str, Dict[str, str]] = {}
+_pending_feed_cache: Dict[str, Dict[str, str]] = {}
+
+def load_feed_cache() -> None:
+    global _feed_cache
+    try:
+        with open(FEED_CACHE_PATH, 'r', encoding='utf-8') as f:
+            _feed_cache = json.load(f)
+    except FileNotFoundError:
+        _feed_cache = {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"[FeedCache] Failed to load {FEED_CACHE_PATH}, starting empty: {e}")
+        _feed_cache = {}
+
+def save_feed_cache() -> None:
+    if not _pending_feed_cache:
+        return
+    _feed_cache.update(_pending_feed_cache)
+    _pending_feed_cache.clear()
+    tmp_path = f"{FEED_CACHE_PATH}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_feed_cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, FEED_CACHE_PATH)
+    except OSError as e:
+        logging.warning(f"[FeedCache] Failed to save {FEED_CACHE_PATH}: {e}")
+
+async def fetch_feed_if_changed(engine: CollectorEngine, feed_info: Dict[str, Any], feed_metrics: FeedMetrics) -> Optional[bytes]:
+    """조건부 GET으로 피드를 가져옵니다. 이전 실행 이후 변경이 없으면 None을 반환합니다."""
+    feed_url = feed_info['url']
+    cached = _feed_cache.get(feed_url, {})
+
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    started = time.perf_counter()
+    try:
+        response = await engine.fetch(feed_url, feed_info['source_domain'], FEED_TIMEOUT, headers=headers)
+    finally:
+        feed_metrics.fetch_seconds = time.perf_counter() - started
+    feed_metrics.status = response.status
+    feed_metrics.bytes = len(response.body)
+    if response.status == 304:
+        return None
+    if response.status >= 400:
+        raise RuntimeError(f"HTTP {response.status} for {feed_url}")
+
+    body = response.body
+    content_hash = hashlib.sha256(body).hexdigest()
+    validators = {'content_hash': content_hash}
+    if response.headers.get('etag'):
+        validators['etag'] = response.headers['etag']
+    if response.headers.get('last-modified'):
+        validators['last_modified'] = response.headers['last-modified']
+    _pending_feed_cache[feed_url] = validators
+
+    if cached.get('content_hash') == content_hash:
+        return None
+    return body
+
+# --- 저장된 기사 URL 인덱스 ---
+# tn_home_article 전체 URL을 매번 가져오는 대신, url_hash 앞 64비트의 집합을 파일로 유지하고
+# 마지막으로 반영한 id 이후의 행만 증분으로 읽어옵니다. 이미 저장된 기사는 스크랩/정제 전에 건너뜁니다.
+KNOWN_URL_INDEX_PATH = os.getenv("KNOWN_URL_INDEX_PATH", os.path.join(os.path.dirname(__file__), 'known_urls.bin'))
+KNOWN_URL_REBUILD_HOURS = int(os.getenv("KNOWN_URL_REBUILD_HOURS", "24"))  # 삭제된 행을 정리하기 위한 전체 재구축 주기
+KNOWN_URL_INDEX_VERSION = 2
+_KNOWN_URL_HEADER = struct.Struct('<Iqd')  # (version, last_id, built_at)
+
+def url_digest(url: str) -> bytes:
+    """tn_home_article.url_hash 값. DB의 UNHEX(SHA2(url, 256))와 같습니다."""
+    return hashlib.sha256(url.encode('utf-8')).digest()
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(url_digest(url)[:8], 'big')
+
+class KnownUrlIndex:
+    """tn_home_article에 저장된 URL의 해시 집합."""
+
+    def __init__(self, path: str = KNOWN_URL_INDEX_PATH):
+        self.path = path
+        self.hashes: Set[int] = set()
+        self.last_id = 0
+        self.built_at = 0.0
+
+    def __contains__(self, url: str) -> bool:
+        return url_hash(url) in self.hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, url: str) -> None:
+        self.hashes.add(url_hash(url))
+
+    def add_digest(self, digest: bytes) -> None:
+        self.hashes.add(int.from_bytes(digest[:8], 'big'))
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'rb') as f:
+                version, last_id, built_at = _KNOWN_URL_HEADER.unpack(f.read(_KNOWN_URL_HEADER.size))
+                values = array('Q')
+                values.frombytes(f.read())
+        except FileNotFoundError:
+            return
+        except (OSError, struct.error, ValueError) as e:
+            logging.warning(f"[KnownUrls] Failed to load {self.path}, rebuilding: {e}")
+            return
+        if version != KNOWN_URL_INDEX_VERSION:
+            logging.info("[KnownUrls] Index format changed, rebuilding from DB.")
+            return
+        if time.time() - built_at > KNOWN_URL_REBUILD_HOURS * 3600:
+            logging.info("[KnownUrls] Index is older than the rebuild interval, rebuilding from DB.")
+            return
+        self.last_id, self.built_at = last_id, built_at
+        self.hashes = set(values)
+
+    def refresh(self, cursor) -> int:
+        """마지막으로 반영한 id 이후의 URL을 읽어 추가하고, 추가된 개수를 반환합니다."""
+        if not self.hashes:
+            self.last_id = 0
+            self.built_at = time.time()
+        cursor.execute("SELECT id, url_hash FROM tn_home_article WHERE id > %s ORDER BY id", (self.last_id,))
+        added = 0
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for row in rows:
+                self.add_digest(row['url_hash'])
+            self.last_id = rows[-1]['id']
+            added += len(rows)
+        return added
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(_KNOWN_URL_HEADER.pack(KNOWN_URL_INDEX_VERSION, self.last_id, self.built_at))
+                f.write(array('Q', self.hashes).tobytes())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"[KnownUrls] Failed to save {self.path}: {e}")
 
 # --- 헬퍼 함수 ---
 def normalize_datetime_to_utc(dt: datetime) -> datetime:
@@ -151,38 +380,155 @@ def normalize_datetime_to_utc(dt: datetime) -> datetime:
         dt = dt.replace(tzinfo=KST)
     return dt.astimezone(timezone.utc)
 
-def resolve_google_news_url(url: str) -> str:
+async def resolve_google_news_url(engine: CollectorEngine, url: str) -> str:
     if 'news.google.com' in url:
         try:
-            session = get_http_session()
-            response = session.head(url, allow_redirects=True, timeout=8)
+            response = await engine.fetch(url, 'news.google.com', PAGE_TIMEOUT, method='HEAD')
             return response.url
-        except requests.RequestException:
+        except (aiohttp.ClientError, asyncio.TimeoutError):
             return url
     return url
-def scrape_og_image(url: str) -> Optional[str]:
+
+async def fetch_page(engine: CollectorEngine, url: str, domain: str, head_only: bool = False,
+                     timeout: float = PAGE_TIMEOUT, feed_metrics: Optional[FeedMetrics] = None) -> Optional[FetchResult]:
+    if feed_metrics is not None:
+        feed_metrics.scrapes += 1
     try:
-        session = get_http_session()
-        response = session.get(url, timeout=8)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content', '').startswith('http'):
-            return og_image['content']
-    except requests.RequestException:
-        pass
-    return None
-
-def scrape_meta_description(url: str) -> Optional[str]:
+        response = await engine.fetch(url, domain, timeout, head_only=head_only)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+    if feed_metrics is not None:
+        feed_metrics.scrape_bytes += len(response.body)
+    return response
+
+# --- 기사 페이지 메타데이터 ---
+PAGE_META_TTL = int(os.getenv("COLLECTOR_PAGE_META_TTL", "3600"))  # 초
+PAGE_META_FAILURE_TTL = 60  # 실패한 요청은 짧게만 기억하여 다음 실행에서 다시 시도
+PAGE_META_CACHE_MAX = 5000
+
+@dataclass
+class PageMetadata:
+    og_image: Optional[str] = None
+    description: Optional[str] = None
+    published_at: Optional[datetime] = None
+    full_page: bool = False  # <head>만이 아니라 본문까지 확인했는지 여부
+
+# URL -> (만료 시각, 메타데이터). 여러 피드에 중복된 기사나 재시도 시 페이지를 다시 받지 않음
+_page_meta_cache: Dict[str, Tuple[float, PageMetadata]] = {}
+# 같은 URL에 대한 동시 요청은 진행 중인 태스크 하나를 공유
+_page_meta_inflight: Dict[str, "asyncio.Task[PageMetadata]"] = {}
+
+_META_TAG_RE = re.compile(r'<meta\b[^>]*>', re.I)
+_ATTR_RE = re.compile(r'''([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+_CHARSET_RE = re.compile(rb'''charset\s*=\s*["']?\s*([-a-zA-Z0-9_]+)''', re.I)
+DATE_META_KEYS = {'article:published_time', 'og:article:published_time', 'article:published', 'pubdate', 'publish-date', 'dc.date.issued'}
+
+def decode_html(body: bytes, content_type: Optional[str]) -> str:
+    """Content-Type 헤더 또는 <meta charset>의 인코딩으로 HTML을 디코딩합니다. (EUC-KR 페이지 대응)"""
+    for source in (content_type.encode('latin-1', 'ignore') if content_type else b'', body[:2048]):
+        match = _CHARSET_RE.search(source)
+        if match:
+            try:
+                return body.decode(match.group(1).decode('ascii'), errors='replace')
+            except LookupError:
+                break
+    return body.decode('utf-8', errors='replace')
+
+def scan_meta_tags(markup: str) -> PageMetadata:
+    """정규식으로 <meta> 태그만 훑어 og:image, description, 발행 시각 메타를 추출합니다."""
+    metadata = PageMetadata()
+    og_image_seen = description_seen = False
+    for tag in _META_TAG_RE.finditer(markup):
+        attrs = {}
+        for attr in _ATTR_RE.finditer(tag.group(0)):
+            value = next(v for v in attr.group(2, 3, 4) if v is not None)
+            attrs[attr.group(1).lower()] = html.unescape(value)
+        key = (attrs.get('property') or attrs.get('name') or attrs.get('itemprop') or '').lower()
+        content = attrs.get('content')
+        if key == 'og:image' and not og_image_seen:
+            # BeautifulSoup의 find()와 같이 첫 번째 og:image만 사용
+            og_image_seen = True
+            if content and content.startswith('http'):
+                metadata.og_image = content
+        elif key == 'description' and content and not description_seen:
+            description_seen = True
+            metadata.description = content
+        elif key in DATE_META_KEYS and content and metadata.published_at is None:
+            try:
+                metadata.published_at = dt_parse(content)
+            except (ValueError, OverflowError):
+                pass
+    return metadata
+
+def extract_page_metadata(content: bytes, content_type: Optional[str], url: str) -> PageMetadata:
+    """전체 기사 HTML에서 메타데이터를 추출합니다. 발행 시각 메타가 없을 때만 본문을 파싱합니다."""
+    markup = decode_html(content, content_type)
+    metadata = scan_meta_tags(markup)
+    metadata.full_page = True
+    if metadata.published_at is not None:
+        return metadata
+
+    # 한겨레는 본문의 '등록' 항목에 정확한 발행 시각이 있음
+    try:
+        soup = BeautifulSoup(markup, 'html.parser')
+        date_li = soup.find(lambda tag: tag.name == 'li' and '등록' in tag.get_text())
+        if date_li:
+            date_span = date_li.find('span')
+            if date_span:
+                metadata.published_at = dt_parse(date_span.get_text())
+    except (ValueError, OverflowError) as e:
+        logging.warning(f"[Scraper] Failed to parse publication date for {url}: {e}")
+    return metadata
+
+def _store_page_metadata(url: str, metadata: PageMetadata, ttl: float) -> None:
+    now = time.monotonic()
+    if len(_page_meta_cache) >= PAGE_META_CACHE_MAX:
+        expired = [key for key, (expires_at, _) in _page_meta_cache.items() if expires_at <= now]
+        for key in expired:
+            del _page_meta_cache[key]
+    _page_meta_cache[url] = (now + ttl, metadata)
+
+async def _load_page_metadata(engine: CollectorEngine, url: str, domain: str, need_published_at: bool,
+                              feed_metrics: Optional[FeedMetrics]) -> PageMetadata:
     try:
-        session = get_http_session()
-        response = session.get(url, timeout=8)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        meta_description = soup.find('meta', attrs={'name': 'description'})
-        if meta_description and meta_description.get('content'):
-            return meta_description['content']
-    except requests.RequestException:
-        pass
-    return None
+        # 대부분은 <head>의 메타 태그만 필요하므로 </head>까지만 스트리밍으로 읽음
+        response = await fetch_page(engine, url, domain, head_only=True, feed_metrics=feed_metrics)
+        metadata = None
+        if response is not None:
+            metadata = scan_meta_tags(decode_html(response.body, response.headers.get('content-type')))
+            if need_published_at and metadata.published_at is None:
+                # 발행 시각이 본문에만 있는 페이지는 전체를 받아 다시 확인
+                response = await fetch_page(engine, url, domain, feed_metrics=feed_metrics)
+                metadata = None
+                if response is not None:
+                    metadata = await asyncio.to_thread(
+                        extract_page_metadata, response.body, response.headers.get('content-type'), url)
+        if metadata is None:
+            metadata = PageMetadata()
+            _store_page_metadata(url, metadata, PAGE_META_FAILURE_TTL)
+            return metadata
+        _store_page_metadata(url, metadata, PAGE_META_TTL)
+        return metadata
+    finally:
+        _page_meta_inflight.pop(url, None)
+
+def _is_usable(metadata: PageMetadata, need_published_at: bool) -> bool:
+    return not need_published_at or metadata.published_at is not None or metadata.full_page
+
+async def get_page_metadata(engine: CollectorEngine, url: str, domain: str, need_published_at: bool = False,
+                            feed_metrics: Optional[FeedMetrics] = None) -> PageMetadata:
+    """기사 페이지 메타데이터를 반환합니다. 같은 URL은 TTL 동안 한 번만 요청/파싱합니다."""
+    cached = _page_meta_cache.get(url)
+    if cached and cached[0] > time.monotonic() and _is_usable(cached[1], need_published_at):
+        return cached[1]
+    task = _page_meta_inflight.get(url)
+    if task is not None:
+        metadata = await task
+        if _is_usable(metadata, need_published_at):
+            return metadata
+    task = asyncio.ensure_future(_load_page_metadata(engine, url, domain, need_published_at, feed_metrics))
+    _page_meta_inflight[url] = task
+    return await task
 
 def clean_title(title: str) -> str:
     if not title: return ''
@@ -196,20 +542,6 @@ def clean_title(title: str) -> str:
     
     return title.strip()
 
-def scrape_hankyoreh_publication_time(url: str) -> Optional[datetime]:
-    try:
-        session = get_http_session()
-        response = session.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        date_li = soup.find(lambda tag: tag.name == 'li' and '등록' in tag.get_text())
-        if date_li:
-            date_span = date_li.find('span')
-            if date_span:
-                return dt_parse(date_span.get_text())
-    except Exception as e:
-        logging.warning(f"[Scraper] Failed to scrape Hankyoreh date for {url}: {e}")
-    return None
-
 def _normalize_image_url(candidate: Optional[str], base_url: str) -> Optional[str]:
     if not candidate:
         return None
@@ -225,229 +557,337 @@ def _get_donga_high_res_url(url: str) -> str:
         return re.sub(r'/i/\d+/\d+/\d+/', '/', url)
     return url
 
-def fetch_and_parse_feed(feed_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def build_article(engine: CollectorEngine, feed_info: Dict[str, Any], item: Any,
+                        known_urls: KnownUrlIndex, stats: CollectStats) -> Optional[Dict[str, Any]]:
+    """피드 항목 하나를 정제하고, 필요한 경우 기사 페이지를 스크랩하여 기사 dict로 만듭니다."""
+    if not item.get('link') or not item.get('title'):
+        return None
+
+    domain = feed_info['source_domain']
+    feed_metrics = stats.metrics.feed(feed_info)
+
+    # Start with the link from the feed
+    final_url = item.link
+    description_html = item.get('description', item.get('summary', ''))
+
+    # If it's a Google News link, extract the real URL from the description
+    if 'news.google.com' in final_url:
+        try:
+            soup = BeautifulSoup(description_html, 'html.parser')
+            link_tag = soup.find('a')
+            if link_tag and link_tag.get('href'):
+                final_url = link_tag.get('href')
+                # logging.info(f"Resolved Google News URL to: {final_url}")
+        except Exception as e:
+            logging.warning(f"Could not parse real URL from Google News description: {e}")
+            # Fallback to the old resolver if parsing fails
+            final_url = await resolve_google_news_url(engine, item.link)
+
+    # 이미 저장된 기사는 제목/본문 정제와 페이지 스크랩을 모두 건너뜀
+    if final_url in known_urls:
+        stats.known_items += 1
+        return None
+
+    cleaned_title = clean_title(item.title)
+    final_title = html.unescape(html.unescape(cleaned_title))
+
+    # HTML 태그 제거 후 엔티티 변환 (&apos;, &middot;, &nbsp; 등)
+    description_text = re.sub('<[^<]+?>', '', description_html).strip()
+    description_text = html.unescape(description_text)
+
+    # Remove author/source tags like [OSEN=조형래 기자], (OSEN=조형래 기자), [스포츠조선 나유리 기자]
+    # Pattern 1: [XXX=기자이름 기자] or (XXX=기자이름 기자)
+    description_text = re.sub(r'[\[\(][^=\[\]\(\)]*=[^\]\)]+[\]\)]', '', description_text).strip()
+    # Pattern 2: [스포츠조선 기자이름 기자], [조선일보 기자이름 기자] 등
+    description_text = re.sub(r'[\[\(](스포츠조선|조선일보|동아일보|중앙일보|경향신문|한겨레|연합뉴스|뉴시스|오마이뉴스)\s*[^\]]+기자[\]\)]', '', description_text).strip()
+
+    source_name = feed_info['source']
+
+    # For Yonhap, Newsis, and Chosun Ilbo, remove the initial reporter tag
+    if source_name in ['연합뉴스', '뉴시스', '조선일보']:
+        # Pattern: 기자이름 기자 = ...
+        description_text = re.sub(r'^.*?기자\s*=\s*', '', description_text).strip()
+        # Pattern: [기자이름 기자] or 기자이름 기자 at the start
+        description_text = re.sub(r'^[\[\(]?[가-힣]+\s*기자[\]\)]?\s*[=\-–]\s*', '', description_text).strip()
+
+    # If description is empty for Hankyoreh or Chosun Ilbo, try to scrape meta description
+    # (page metadata is fetched and parsed at most once per URL, shared by all lookups below)
+    # Hankyoreh pages are also needed for the publication time, so ask for it on every lookup.
+    need_published_at = source_name == '한겨레'
+    if not description_text and source_name in ['한겨레', '조선일보']:
+        scraped_description = (await get_page_metadata(engine, final_url, domain, need_published_at, feed_metrics)).description
+        if scraped_description:
+            description_text = scraped_description
+
+    published_time_utc: Optional[datetime] = None
+
+    if source_name == '한겨레':
+        scraped_time = (await get_page_metadata(engine, final_url, domain, need_published_at, feed_metrics)).published_at
+        if scraped_time:
+            published_time_utc = normalize_datetime_to_utc(scraped_time)
+
+    if not published_time_utc:
+        time_struct = item.get('published_parsed') or item.get('updated_parsed')
+        if time_struct:
+            utc_timestamp = calendar.timegm(time_struct)
+            published_time_utc = datetime.fromtimestamp(utc_timestamp, tz=timezone.utc)
+
+    if not published_time_utc:
+        date_string = item.get('published') or item.get('updated') or item.get('dc_date')
+        if date_string:
+            try:
+                parsed_time = dt_parse(date_string)
+                published_time_utc = normalize_datetime_to_utc(parsed_time)
+            except (ValueError, TypeError):
+                pass
+
+    if not published_time_utc:
+        published_time_utc = datetime.now(timezone.utc)
+
+    if published_time_utc < (datetime.now(timezone.utc) - timedelta(days=1)):
+        return None
+
+    thumbnail_url: Optional[str] = None
+
+    # For JoongAng Ilbo, prioritize scraping the high-quality og:image first.
+    if feed_info['source'] == '중앙일보':
+        thumbnail_url = (await get_page_metadata(engine, final_url, domain, need_published_at, feed_metrics)).og_image
+
+    # Fallback for other sources or if JoongAng scraping fails
+    if not thumbnail_url and hasattr(item, 'media_thumbnail') and item.media_thumbnail:
+        thumbnail_url = item.media_thumbnail[0].get('url')
+
+    if not thumbnail_url and hasattr(item, 'media_content') and item.media_content:
+        for media in item.media_content:
+            if media.get('medium') == 'image' and media.get('url'):
+                thumbnail_url = media.get('url')
+                break
+
+    if not thumbnail_url and description_html:
+        img_match = re.search(r'<img[^>]+src=["\"]([^"\"]+)["\"]', description_html)
+        if img_match:
+            thumbnail_url = img_match.group(1)
+
+    # Generic fallback to scrape og:image if no thumbnail has been found yet
+    if not thumbnail_url:
+        thumbnail_url = (await get_page_metadata(engine, final_url, domain, need_published_at, feed_metrics)).og_image
+
+    if thumbnail_url:
+        thumbnail_url = _normalize_image_url(thumbnail_url, final_url)
+        if thumbnail_url and "donga.com" in final_url:
+            thumbnail_url = _get_donga_high_res_url(thumbnail_url)
+
+    if not thumbnail_url:
+        thumbnail_url = LOGO_FALLBACK_MAP.get(source_name)
+
+    return {
+        'source': feed_info['source'],
+        'source_domain': feed_info['source_domain'],
+        'side': feed_info['side'],
+        'category': feed_info['section'],
+        'feed_url': feed_info['url'],
+        'title': final_title,
+        'url': final_url,
+        'url_hash': url_digest(final_url),
+        'published_at': published_time_utc,
+        'thumbnail_url': thumbnail_url,
+        'description': description_text
+    }
+
+def parse_feed_entries(body: bytes) -> Tuple[List[Any], bool]:
+    """RSS 2.0 피드는 fast_rss로, 그 외 형식이나 파싱 실패 시에는 feedparser로 항목을 파싱합니다."""
+    if COLLECTOR_FAST_RSS:
+        entries = parse_rss(body)
+        if entries is not None:
+            return entries, True
+    return feedparser.parse(body.decode('utf-8', errors='replace')).entries, False
+
+async def fetch_and_parse_feed(engine: CollectorEngine, feed_info: Dict[str, Any],
+                               known_urls: KnownUrlIndex, stats: CollectStats) -> Optional[List[Dict[str, Any]]]:
+    """피드를 수집하여 기사 목록을 반환합니다. 피드가 변경되지 않았으면 None을 반환합니다."""
     articles = []
+    feed_metrics = stats.metrics.feed(feed_info)
     try:
-        session = get_http_session()
-        response = session.get(feed_info['url'], timeout=15)
-        response.encoding = 'utf-8'
-        parsed_feed = feedparser.parse(response.text)
-
-        for item in parsed_feed.entries:
-            if not item.get('link') or not item.get('title'):
-                continue
-
-            # Start with the link from the feed
-            final_url = item.link
-            description_html = item.get('description', item.get('summary', ''))
-
-            # If it's a Google News link, extract the real URL from the description
-            if 'news.google.com' in final_url:
-                try:
-                    soup = BeautifulSoup(description_html, 'html.parser')
-                    link_tag = soup.find('a')
-                    if link_tag and link_tag.get('href'):
-                        final_url = link_tag.get('href')
-                        # logging.info(f"Resolved Google News URL to: {final_url}")
-                except Exception as e:
-                    logging.warning(f"Could not parse real URL from Google News description: {e}")
-                    # Fallback to the old resolver if parsing fails
-                    final_url = resolve_google_news_url(item.link)
-            
-            cleaned_title = clean_title(item.title)
-            final_title = html.unescape(html.unescape(cleaned_title))
-            
-            # HTML 태그 제거 후 엔티티 변환 (&apos;, &middot;, &nbsp; 등)
-            description_text = re.sub('<[^<]+?>', '', description_html).strip()
-            description_text = html.unescape(description_text)
-            
-            # Remove author/source tags like [OSEN=조형래 기자], (OSEN=조형래 기자), [스포츠조선 나유리 기자]
-            # Pattern 1: [XXX=기자이름 기자] or (XXX=기자이름 기자)
-            description_text = re.sub(r'[\[\(][^=\[\]\(\)]*=[^\]\)]+[\]\)]', '', description_text).strip()
-            # Pattern 2: [스포츠조선 기자이름 기자], [조선일보 기자이름 기자] 등
-            description_text = re.sub(r'[\[\(](스포츠조선|조선일보|동아일보|중앙일보|경향신문|한겨레|연합뉴스|뉴시스|오마이뉴스)\s*[^\]]+기자[\]\)]', '', description_text).strip()
-            
-            source_name = feed_info['source']
-
-            # For Yonhap, Newsis, and Chosun Ilbo, remove the initial reporter tag
-            if source_name in ['연합뉴스', '뉴시스', '조선일보']:
-                # Pattern: 기자이름 기자 = ...
-                description_text = re.sub(r'^.*?기자\s*=\s*', '', description_text).strip()
-                # Pattern: [기자이름 기자] or 기자이름 기자 at the start
-                description_text = re.sub(r'^[\[\(]?[가-힣]+\s*기자[\]\)]?\s*[=\-–]\s*', '', description_text).strip()
-            
-            # If description is empty for Hankyoreh or Chosun Ilbo, try to scrape meta description
-            if not description_text and source_name in ['한겨레', '조선일보']:
-                scraped_description = scrape_meta_description(final_url)
-                if scraped_description:
-                    description_text = scraped_description
-            
-            published_time_utc: Optional[datetime] = None
-
-            if source_name == '한겨레':
-                scraped_time = scrape_hankyoreh_publication_time(final_url)
-                if scraped_time:
-                    published_time_utc = normalize_datetime_to_utc(scraped_time)
-
-            if not published_time_utc:
-                time_struct = item.get('published_parsed') or item.get('updated_parsed')
-                if time_struct:
-                    utc_timestamp = calendar.timegm(time_struct)
-                    published_time_utc = datetime.fromtimestamp(utc_timestamp, tz=timezone.utc)
-
-            if not published_time_utc:
-                date_string = item.get('published') or item.get('updated') or item.get('dc_date')
-                if date_string:
-                    try:
-                        parsed_time = dt_parse(date_string)
-                        published_time_utc = normalize_datetime_to_utc(parsed_time)
-                    except (ValueError, TypeError):
-                        pass
-            
-            if not published_time_utc:
-                published_time_utc = datetime.now(timezone.utc)
-
-            if published_time_utc < (datetime.now(timezone.utc) - timedelta(days=1)):
-                continue
-
-            thumbnail_url: Optional[str] = None
-
-            # For JoongAng Ilbo, prioritize scraping the high-quality og:image first.
-            if feed_info['source'] == '중앙일보':
-                thumbnail_url = scrape_og_image(final_url)
-
-            # Fallback for other sources or if JoongAng scraping fails
-            if not thumbnail_url and hasattr(item, 'media_thumbnail') and item.media_thumbnail:
-                thumbnail_url = item.media_thumbnail[0].get('url')
-            
-            if not thumbnail_url and hasattr(item, 'media_content') and item.media_content:
-                for media in item.media_content:
-                    if media.get('medium') == 'image' and media.get('url'):
-                        thumbnail_url = media.get('url')
-                        break
-            
-            if not thumbnail_url and description_html:
-                img_match = re.search(r'<img[^>]+src=["\"]([^"\"]+)["\"]', description_html)
-                if img_match:
-                    thumbnail_url = img_match.group(1)
-
-            # Generic fallback to scrape og:image if no thumbnail has been found yet
-            if not thumbnail_url:
-                thumbnail_url = scrape_og_image(final_url)
-
-            if thumbnail_url:
-                thumbnail_url = _normalize_image_url(thumbnail_url, final_url)
-                if thumbnail_url and "donga.com" in final_url:
-                    thumbnail_url = _get_donga_high_res_url(thumbnail_url)
-            
-            if not thumbnail_url:
-                thumbnail_url = LOGO_FALLBACK_MAP.get(source_name)
-
-            articles.append({
-                'source': feed_info['source'],
-                'source_domain': feed_info['source_domain'],
-                'side': feed_info['side'],
-                'category': feed_info['section'],
-                'title': final_title,
-                'url': final_url,
-                'published_at': published_time_utc,
-                'thumbnail_url': thumbnail_url,
-                'description': description_text
-            })
+        body = await fetch_feed_if_changed(engine, feed_info, feed_metrics)
+        if body is None:
+            feed_metrics.unchanged = True
+            return None
+        # 파싱은 CPU 작업이므로 이벤트 루프를 막지 않도록 별도 스레드에서 실행
+        started = time.perf_counter()
+        entries, feed_metrics.fast_parsed = await asyncio.to_thread(parse_feed_entries, body)
+        feed_metrics.parse_seconds = time.perf_counter() - started
+        feed_metrics.entries = len(entries)
+
+        # 항목별 기사 페이지 스크랩은 각각 별도 태스크로 동시에 진행
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(build_article(engine, feed_info, item, known_urls, stats) for item in entries),
+            return_exceptions=True,
+        )
+        feed_metrics.enrich_seconds = time.perf_counter() - started
+        item_failed = False
+        for result in results:
+            if isinstance(result, Exception):
+                logging.warning(f"{feed_info['source']} 기사 처리 실패: {result}")
+                item_failed = True
+            elif result:
+                articles.append(result)
+        feed_metrics.kept = len(articles)
+        if item_failed:
+            # 실패한 항목을 다음 실행에서 다시 처리하도록 검증값(ETag/Last-Modified/해시)을 반영하지 않음
+            _pending_feed_cache.pop(feed_info['url'], None)
     except Exception as e:
         logging.error(f"{feed_info['source']}' 피드 처리 실패: {e}")
+        stats.failed_feeds.add(feed_info['url'])
+        feed_metrics.failed = True
+        # 처리에 실패한 피드는 다음 실행에서 다시 파싱하도록 검증값을 반영하지 않음
+        _pending_feed_cache.pop(feed_info['url'], None)
     return articles
 
-# --- 알림 발송 함수 ---
-def send_notification(notification_type: str, article: Dict[str, Any]):
-    """내부 알림 API를 호출하여 실시간 알림을 요청합니다."""
-    if not INTERNAL_API_URL:
-        return
-
-    payload = {
-        "notification_type": notification_type,
-        "data": {
-            "title": article.get('title'),
-            "url": article.get('url'),
-            "source": article.get('source'),
-            "source_domain": article.get('source_domain'),
-            "thumbnail_url": article.get('thumbnail_url'),
-            "published_at": article.get('published_at').isoformat() if article.get('published_at') else None,
-        }
-    }
-    try:
-        response = requests.post(INTERNAL_API_URL, json=payload, timeout=5)
-        response.raise_for_status() # 2xx 응답이 아니면 에러 발생
-        logging.info(f"[Notification] Sent {notification_type} notification for article: {article.get('title')}")
-    except requests.RequestException as e:
-        logging.error(f"[Notification] Failed to send notification: {e}")
+async def collect_articles(known_urls: KnownUrlIndex, feeds: List[Dict[str, Any]], stats: CollectStats) -> List[Dict[str, Any]]:
+    """주어진 피드를 하나의 HTTP 세션으로 동시에 수집하여 새 기사 목록을 반환합니다. 통계는 stats에 기록됩니다."""
+    all_articles: List[Dict[str, Any]] = []
+    async with create_http_session() as session:
+        engine = CollectorEngine(session)
+        results = await asyncio.gather(
+            *(fetch_and_parse_feed(engine, feed, known_urls, stats) for feed in feeds),
+            return_exceptions=True,
+        )
+    for feed_info, result in zip(feeds, results):
+        if isinstance(result, Exception):
+            logging.error(f"{feed_info['source']} 피드 처리 중 예외 발생: {result}")
+            stats.failed_feeds.add(feed_info['url'])
+        elif result is None:
+            stats.skipped_feeds += 1
+        else:
+            all_articles.extend(result)
+    return all_articles
+
+# --- DB 저장 ---
+DB_WRITE_CHUNK_SIZE = int(os.getenv("COLLECTOR_DB_CHUNK_SIZE", "200"))
+
+def _chunks(items: List[Any], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def filter_existing_articles(cursor, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """이번 배치의 url_hash만 조회하여 아직 저장되지 않은 기사만 반환합니다."""
+    existing: Set[bytes] = set()
+    for chunk in _chunks(articles, DB_WRITE_CHUNK_SIZE):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT url_hash FROM tn_home_article WHERE url_hash IN ({placeholders})",
+            [a['url_hash'] for a in chunk],
+        )
+        existing.update(bytes(row['url_hash']) for row in cursor.fetchall())
+    return [a for a in articles if a['url_hash'] not in existing]
+
+def insert_articles(cnx, cursor, articles: List[Dict[str, Any]]) -> int:
+    """기사를 청크 단위 multi-row INSERT IGNORE로 저장하고, 청크마다 커밋합니다. 저장된 행 수를 반환합니다."""
+    insert_query = (
+        "INSERT IGNORE INTO tn_home_article "
+        "(source, source_domain, side, category, title, url, url_hash, published_at, thumbnail_url, description) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    inserted = 0
+    for chunk in _chunks(articles, DB_WRITE_CHUNK_SIZE):
+        rows = [(a['source'], a['source_domain'], a['side'], a['category'], a['title'], a['url'], a['url_hash'],
+                 a['published_at'].strftime('%Y-%m-%dT%H:%M:%SZ'), a['thumbnail_url'], a['description']) for a in chunk]
+        # pymysql은 INSERT ... VALUES 문의 executemany를 하나의 multi-row INSERT로 묶어서 전송함
+        cursor.executemany(insert_query, rows)
+        cnx.commit()
+        inserted += cursor.rowcount
+    return inserted
 
 # --- 메인 로직 ---
-def main():
+def main(due_only: bool = False):
     logging.info("--- 최신 기사 병렬 수집 시작 ---")
-    all_articles = []
+    load_feed_cache()
 
-    logging.info("Step 1: Starting parallel feed fetching...")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_feed = {executor.submit(fetch_and_parse_feed, feed): feed for feed in FEEDS}
-        for future in concurrent.futures.as_completed(future_to_feed):
-            try:
-                articles_from_feed = future.result()
-                if articles_from_feed:
-                    all_articles.extend(articles_from_feed)
-            except Exception as exc:
-                feed_info = future_to_feed[future]
-                logging.error(f"{feed_info['source']} 피드 처리 중 예외 발생: {exc}")
-
-    logging.info(f"Step 2: Completed parsing for a total of {len(all_articles)} articles.")
-
-    # 여러 피드에서 동일한 기사가 수집되었을 수 있으므로 URL 기준으로 중복 제거
-    unique_articles_map = {article['url']: article for article in all_articles}
-    all_articles = list(unique_articles_map.values())
-    logging.info(f"Step 2.5: Found {len(all_articles)} unique articles after de-duplication.")
-
-    if not all_articles:
-        logging.info("No new articles to save. Exiting.")
+    # --due-only: 피드별 적응형 주기(feed_scheduler.py)에 따라 폴링할 차례인 피드만 수집
+    scheduler = FeedScheduler().load()
+    feeds = scheduler.due_feeds(FEEDS) if due_only else FEEDS
+    if not feeds:
+        logging.info(f"No feeds are due. Next feed is due in {scheduler.seconds_until_next_due():.0f}s. Exiting.")
         return
 
+    stats = CollectStats()
+    metrics = stats.metrics
+    dispatcher: Optional[NotificationDispatcher] = None
+    cnx = None
     try:
-        logging.info("Step 3: Attempting to connect to the database...")
+        logging.info("Step 1: Attempting to connect to the database...")
         cnx = pymysql.connect(**DB_CONFIG)
         cursor = cnx.cursor(pymysql.cursors.DictCursor)
-        logging.info("Step 4: Database connection successful.")
-
-        # 기존에 저장된 URL 목록을 가져와서 중복 체크
-        cursor.execute("SELECT url FROM tn_home_article")
-        existing_urls = {row['url'] for row in cursor.fetchall()}
-        
-        new_articles = [a for a in all_articles if a['url'] not in existing_urls]
 
-        logging.info(f"Step 5: Found {len(new_articles)} new articles to save and notify.")
+        # 스크랩 전에 이미 저장된 URL 인덱스를 먼저 준비
+        with metrics.stage('index'):
+            known_urls = KnownUrlIndex()
+            known_urls.load()
+            added = known_urls.refresh(cursor)
+        logging.info(f"Step 2: Known URL index ready with {len(known_urls)} entries ({added} added from DB).")
+
+        logging.info(f"Step 3: Starting parallel feed fetching for {len(feeds)}/{len(FEEDS)} feeds...")
+        with metrics.stage('collect'):
+            all_articles = asyncio.run(collect_articles(known_urls, feeds, stats))
+        logging.info(f"Step 3.5: Skipped {stats.skipped_feeds}/{len(feeds)} unchanged feeds and {stats.known_items} already stored articles.")
+
+        with metrics.stage('dedupe'):
+            # 여러 피드에서 동일한 기사가 수집되었을 수 있으므로 URL 기준으로 중복 제거
+            unique_articles_map = {article['url']: article for article in all_articles}
+            # 인덱스 갱신 이후 다른 프로세스가 저장했을 수 있으므로 이번 배치의 해시만 DB에서 다시 확인
+            new_articles = filter_existing_articles(cursor, list(unique_articles_map.values()))
+        metrics.set_counter('new_articles', len(new_articles))
+        logging.info(f"Step 4: Found {len(new_articles)} new articles to save and notify.")
 
         if new_articles:
-            # ===== 속보/단독 뉴스 자동 알림 (비활성화) =====
-            # 활성화하려면 아래 주석을 해제하세요
-            # for article in new_articles:
-            #     title = article.get('title', '')
-            #     if '[속보]' in title:
-            #         send_notification('BREAKING_NEWS', article)
-            #     elif '[단독]' in title:
-            #         send_notification('EXCLUSIVE_NEWS', article)
-
             # DB 저장 로직
-            insert_query = "INSERT INTO tn_home_article (source, source_domain, side, category, title, url, published_at, thumbnail_url, description) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
-            data_to_insert = [(a['source'], a['source_domain'], a['side'], a['category'], a['title'], a['url'], a['published_at'].strftime('%Y-%m-%dT%H:%M:%SZ'), a['thumbnail_url'], a['description']) for a in new_articles]
-            cursor.executemany(insert_query, data_to_insert)
-            cnx.commit()
-            logging.info(f"Step 6: {cursor.rowcount} new articles saved successfully.")
+            with metrics.stage('db_insert'):
+                inserted = insert_articles(cnx, cursor, new_articles)
+            metrics.set_counter('inserted_articles', inserted)
+            logging.info(f"Step 5: {inserted} new articles saved successfully.")
+
+            # ===== 속보/단독 뉴스 자동 알림 =====
+            # ENABLE_BREAKING_NOTIFICATIONS=true일 때만 발송하며, 전송은 백그라운드 스레드에서 배치로 처리됨
+            if ENABLE_BREAKING_NOTIFICATIONS:
+                dispatcher = NotificationDispatcher().start()
+                for article in new_articles:
+                    title = article.get('title', '')
+                    if '[속보]' in title:
+                        dispatcher.enqueue('BREAKING_NEWS', article)
+                    elif '[단독]' in title:
+                        dispatcher.enqueue('EXCLUSIVE_NEWS', article)
+
+            # 방금 저장한 행까지 인덱스에 반영
+            known_urls.refresh(cursor)
+
+        known_urls.save()
+        save_feed_cache()
+
+        # 피드별 새 기사 수와 실패 여부로 다음 폴링 시각을 조정
+        new_by_feed = Counter(a['feed_url'] for a in new_articles)
+        for feed in feeds:
+            scheduler.record(feed['url'], new_by_feed.get(feed['url'], 0), failed=feed['url'] in stats.failed_feeds)
+        scheduler.save()
 
     except pymysql.Error as err:
         logging.error(f"DB 오류 발생: {err}")
         sys.exit(1)
     finally:
-        if 'cnx' in locals() and cnx.open:
+        if cnx and cnx.open:
             cursor.close()
             cnx.close()
+        if dispatcher is not None:
+            dispatcher.close(timeout=NOTIFICATION_CLOSE_TIMEOUT)
+            metrics.set_counter('notifications_sent', dispatcher.sent)
+            metrics.set_counter('notifications_dropped', dispatcher.dropped)
+        metrics.set_counter('feeds_polled', len(feeds))
+        metrics.set_counter('feeds_unchanged', stats.skipped_feeds)
+        metrics.set_counter('feeds_failed', len(stats.failed_feeds))
+        metrics.set_counter('known_items_skipped', stats.known_items)
+        metrics.finalize()
+        metrics.write_prometheus(METRICS_PROM_PATH)
+        metrics.append_history(METRICS_HISTORY_PATH)
 
 if __name__ == "__main__":
-    main()
+    main(due_only='--due-only' in sys.argv[1:])
@@ -3,7 +3,7 @@ import sys
 import os
 import time
 
-def run_script(script_name):
+def run_script(script_name, args=()):
     print(f"\n[Pipeline] Starting {script_name}...")
     start_time = time.time()
     
@@ -13,7 +13,7 @@ def run_script(script_name):
     
     # 서브프로세스로 실행 (메모리 격리 및 해제 보장)
     # check=False로 설정하여 에러가 나도 일단 다음 단계 진행 여부를 결정할 수 있게 함
-    result = subprocess.run([python_exe, script_path], capture_output=False)
+    result = subprocess.run([python_exe, script_path, *args], capture_output=False)
     
     elapsed = time.time() - start_time
     print(f"[Pipeline] Finished {script_name} in {elapsed:.2f}s. Exit code: {result.returncode}")
@@ -24,7 +24,8 @@ if __name__ == "__main__":
     print("=== Starting News Collection & Embedding Pipeline ===")
     
     # 1. RSS 수집 (기사 긁어오기)
-    if not run_script("rss_collector.py"):
+    # --due-only 등 전달받은 인자는 rss_collector.py로 넘김
+    if not run_script("rss_collector.py", sys.argv[1:]):
         print("[Pipeline] RSS collection failed. Aborting pipeline.")
         sys.exit(1)
         
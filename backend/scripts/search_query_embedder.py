@@ -4,44 +4,45 @@
 """
 embed_query.py
 - A simple script that takes a query string as a command-line argument.
-- Loads the sentence-transformer model.
-- Computes the embedding for the query.
-- Prints the resulting vector to stdout as a JSON string.
+- Computes the embedding for the query through the resident embedding_server.py (/query, LRU cached);
+  loads the sentence-transformer model in-process only when the server is not running.
+- Prints the resulting vector to stdout as a JSON string, or as raw little-endian float32 with --binary.
 """
 
 import sys
 import json
 import os
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import numpy as np
 
+from embedding_utils import encode_query
+
 # .env ?�일 로드
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-MODEL_NAME = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
-
 def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--binary"]
+    binary = len(args) != len(sys.argv) - 1
+
     # Check if at least one argument (the query) is provided
-    if len(sys.argv) < 2:
+    if not args:
         # Print error to stderr
-        print("Usage: python embed_query.py \"your query string\"", file=sys.stderr)
+        print("Usage: python embed_query.py [--binary] \"your query string\"", file=sys.stderr)
         sys.exit(1)
 
-    query = sys.argv[1]
+    query = args[0]
 
     try:
-        model = SentenceTransformer(MODEL_NAME)
-        
-        # Add 'query: ' prefix as required by the E5 model
-        prefixed_query = f"query: {query}"
-        
-        # Generate embedding
-        embedding = model.encode(prefixed_query, normalize_embeddings=True)
-        
-        # Convert to a standard Python list of floats and print as JSON
-        print(json.dumps(embedding.tolist()))
+        # 'query: ' prefix required by the E5 model is added inside encode_query
+        embedding = encode_query(query)
+
+        if binary:
+            # 768 float32 = 3KB, about a fifth of the JSON text
+            sys.stdout.buffer.write(np.asarray(embedding, dtype='<f4').tobytes())
+        else:
+            # Convert to a standard Python list of floats and print as JSON
+            print(json.dumps(embedding.tolist()))
 
     except Exception as e:
         print(f"An error occurred during embedding: {e}", file=sys.stderr)
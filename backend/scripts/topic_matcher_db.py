@@ -4,10 +4,15 @@ import sys
 import json
 import pymysql
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 from typing import List, Dict, Any
 
+from datetime import datetime, timedelta, timezone
+
+from embedding_utils import encode_texts
+from article_ann_index import ArticleAnnIndex
+from topic_query_cache import load_query_embeddings
+
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=dotenv_path)
@@ -18,7 +23,14 @@ DB_PORT = int(os.getenv("DB_PORT", 4000))
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME", "test")
-MODEL_NAME = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base") # Must match DB stored vectors
+# EMBED_MODEL (read in embedding_utils) must match DB stored vectors
+ANN_MATCHING = os.getenv("ANN_MATCHING", "auto").lower()  # auto: use the local ANN index only when it covers the DB | on | off
+ANN_MIN_COVERAGE = float(os.getenv("ANN_MIN_COVERAGE", "0.99"))  # auto: share of embedded rows in the window the index must hold
+SEARCH_WINDOW_DAYS = 7
+MIN_SIMILARITY = 0.7  # distance <= 0.3
+CANDIDATES_PER_SIDE = 10
+INSERT_CHUNK_SIZE = int(os.getenv("CANDIDATE_INSERT_CHUNK_SIZE", "200"))  # Rows per multi-row INSERT IGNORE
+SIDES = ['LEFT', 'RIGHT', 'CENTER']
 
 def get_db_connection():
     return pymysql.connect(
@@ -31,13 +43,13 @@ def get_db_connection():
         ssl={'ssl': {'rejectUnauthorized': False}} # TiDB Cloud requires SSL
     )
 
-def get_embedding(model, text: str) -> List[float]:
+def get_embedding(text: str) -> List[float]:
     # E5 models require 'query: ' or 'passage: ' prefix
     # We use 'passage: ' for articles and 'query: ' for search keywords
     # But for simplicity and consistency in this script, we'll handle prefixes in the caller
-    return model.encode(text, normalize_embeddings=True).tolist()
+    return encode_texts([text], label="topic_matcher_db")[0].tolist()
 
-def update_article_embeddings(conn, model):
+def update_article_embeddings(conn):
     """
     Fetches articles from tn_home_article with NULL embeddings and updates them.
     """
@@ -53,10 +65,10 @@ def update_article_embeddings(conn, model):
 
         print(f"Found {len(articles)} articles to embed.")
         
-        for article in articles:
-            text_to_embed = f"passage: {article['title']} {article['description'] or ''}"
-            embedding = get_embedding(model, text_to_embed)
-            embedding_json = json.dumps(embedding)
+        texts = [f"passage: {article['title']} {article['description'] or ''}" for article in articles]
+        embeddings = encode_texts(texts, label="topic_matcher_db")
+        for article, embedding in zip(articles, embeddings):
+            embedding_json = json.dumps(embedding.tolist())
             
             # Update the article with the embedding
             cursor.execute("UPDATE tn_home_article SET embedding = %s WHERE id = %s", (embedding_json, article['id']))
@@ -64,91 +76,193 @@ def update_article_embeddings(conn, model):
         conn.commit()
         print(f"Updated {len(articles)} articles.")
 
-def collect_articles_for_topic(conn, model, topic_id: int):
-    print(f"Collecting articles for topic ID: {topic_id}")
-    
+# Every value is a placeholder so pymysql's executemany() folds each chunk into one multi-row INSERT
+INSERT_CANDIDATE_SQL = """
+INSERT IGNORE INTO tn_article (topic_id, source, source_domain, side, title, url, published_at, thumbnail_url, rss_desc, status, similarity)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def insert_candidates(cursor, candidates: List[Dict[str, Any]]) -> int:
+    """
+    Writes candidates (rows carrying topic_id, side and distance) as chunked multi-row INSERT IGNOREs.
+    The unique (topic_id, url) index drops anything another run inserted meanwhile. Returns rows inserted.
+    """
+    inserted = 0
+    for start in range(0, len(candidates), INSERT_CHUNK_SIZE):
+        chunk = candidates[start:start + INSERT_CHUNK_SIZE]
+        inserted += cursor.executemany(INSERT_CANDIDATE_SQL, [
+            # distance is 0 for identical, 1 for opposite. Similarity = 1 - distance (roughly)
+            (row['topic_id'], row['source'], row['source_domain'], row['side'], row['title'], row['url'],
+             row['published_at'], row['thumbnail_url'], row['description'], 'suggested', 1 - row['distance'])
+            for row in chunk
+        ]) or 0
+    return inserted
+
+def fetch_topics(cursor, topic_ids: List[int]) -> List[Dict[str, Any]]:
+    placeholders = ", ".join(["%s"] * len(topic_ids))
+    cursor.execute(f"SELECT id, display_name, embedding_keywords FROM tn_topic WHERE id IN ({placeholders})", topic_ids)
+    return cursor.fetchall()
+
+def ann_index_is_complete(cursor, index: ArticleAnnIndex) -> bool:
+    """
+    The local index only holds what this host vectorized (plus --rebuild), e.g. right after deploy or
+    with --lease workers on several hosts. Compare it with the embedded rows of the search window so
+    an incomplete index never silently returns fewer candidates than the SQL path.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=SEARCH_WINDOW_DAYS)
+    cursor.execute(
+        "SELECT COUNT(*) AS embedded, MAX(id) AS max_id FROM tn_home_article WHERE embedding IS NOT NULL AND published_at >= %s",
+        (since,),
+    )
+    row = cursor.fetchone()
+    embedded, max_id = int(row['embedded'] or 0), int(row['max_id'] or 0)
+    indexed, index_max_id = index.coverage(since)
+    if indexed < embedded * ANN_MIN_COVERAGE or index_max_id < max_id:
+        print(f"Local ANN index is incomplete ({indexed}/{embedded} embedded articles in the window, "
+              f"max id {index_max_id}/{max_id}); using the SQL vector search. Run article_ann_index.py --rebuild.")
+        return False
+    return True
+
+def find_candidates_ann(cursor, index: ArticleAnnIndex, topics: List[Dict[str, Any]],
+                        query_embeddings: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Approximate version of find_candidates_sql(), served from the local ANN index (article_ann_index.py)
+    so it also works on plain MySQL; filtered recall@10 is checked with article_ann_index.py --recall.
+    The index is searched per topic and side in-process; the DB is hit once for the URLs already
+    attached to the topics and once for the hit rows.
+    """
+    topic_ids = [topic['id'] for topic in topics]
+    placeholders = ", ".join(["%s"] * len(topic_ids))
+    cursor.execute(f"SELECT topic_id, url FROM tn_article WHERE topic_id IN ({placeholders})", topic_ids)
+    existing = {(row['topic_id'], row['url']) for row in cursor.fetchall()}
+    existing_per_topic = {topic_id: 0 for topic_id in topic_ids}
+    for topic_id, _ in existing:
+        existing_per_topic[topic_id] += 1
+
+    since = datetime.now(timezone.utc) - timedelta(days=SEARCH_WINDOW_DAYS)
+    hits = {}  # (topic_id, side) -> [(article id, similarity)]
+    for topic, query in zip(topics, query_embeddings):
+        for side in SIDES:
+            # Over-fetch by the number of URLs already attached to the topic so filtering them still leaves enough
+            hits[(topic['id'], side)] = index.search(query, CANDIDATES_PER_SIDE + existing_per_topic[topic['id']],
+                                                     side=side, since=since, min_similarity=MIN_SIMILARITY)
+    article_ids = sorted({article_id for found in hits.values() for article_id, _ in found})
+    if not article_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(article_ids))
+    cursor.execute(
+        f"""
+        SELECT id, source, source_domain, title, url, published_at, thumbnail_url, description
+        FROM tn_home_article WHERE id IN ({placeholders})
+        """,
+        article_ids,
+    )
+    rows_by_id = {row['id']: row for row in cursor.fetchall()}
+
+    candidates = []
+    for (topic_id, side), found in hits.items():
+        picked = 0
+        for article_id, similarity in found:
+            row = rows_by_id.get(article_id)  # rows pruned from the DB are skipped
+            if row is None or (topic_id, row['url']) in existing:
+                continue
+            candidates.append(dict(row, topic_id=topic_id, side=side, distance=1 - similarity))
+            picked += 1
+            if picked >= CANDIDATES_PER_SIDE:
+                break
+    return candidates
+
+def find_candidates_sql(cursor, topics: List[Dict[str, Any]], query_embeddings: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Top CANDIDATES_PER_SIDE articles per (topic, side) for all topics in one TiDB vector query.
+    Topic vectors are joined in as a derived table, existing topic articles are removed with an
+    anti-join on the (topic_id, url) index, and ROW_NUMBER() keeps the top k of each partition.
+    """
+    queries_sql = " UNION ALL ".join(["SELECT %s AS topic_id, VEC_FROM_TEXT(%s) AS embedding"] * len(topics))
+    params: List[Any] = []
+    for topic, query in zip(topics, query_embeddings):
+        params.extend((topic['id'], json.dumps(query.tolist())))
+    cursor.execute(
+        f"""
+        SELECT * FROM (
+            SELECT q.topic_id, h.id, h.side, h.source, h.source_domain, h.title, h.url, h.published_at,
+                   h.thumbnail_url, h.description, VEC_COSINE_DISTANCE(h.embedding, q.embedding) AS distance,
+                   ROW_NUMBER() OVER (PARTITION BY q.topic_id, h.side
+                                      ORDER BY VEC_COSINE_DISTANCE(h.embedding, q.embedding)) AS side_rank
+            FROM ({queries_sql}) q
+            JOIN tn_home_article h
+              ON h.side IN ('LEFT', 'RIGHT', 'CENTER')
+             AND h.embedding IS NOT NULL
+             AND h.published_at IS NOT NULL
+             AND h.published_at >= DATE_SUB(NOW(), INTERVAL {SEARCH_WINDOW_DAYS} DAY)
+            LEFT JOIN tn_article a ON a.topic_id = q.topic_id AND a.url = h.url
+            WHERE a.id IS NULL
+              AND VEC_COSINE_DISTANCE(h.embedding, q.embedding) <= %s
+        ) ranked
+        WHERE side_rank <= %s
+        ORDER BY topic_id, side, distance
+        """,
+        params + [1 - MIN_SIMILARITY, CANDIDATES_PER_SIDE],
+    )
+    return cursor.fetchall()
+
+def collect_articles_for_topics(conn, topic_ids: List[int]) -> int:
+    """
+    Suggests articles for one or many topics in a fixed number of round trips: topics, candidate
+    search (one vector query, or a coverage check plus the local ANN index and two lookups), chunked
+    INSERT IGNORE, commit.
+    """
+    print(f"Collecting articles for topic IDs: {topic_ids}")
+
     with conn.cursor() as cursor:
         # 1. Get Topic Keywords
-        cursor.execute("SELECT display_name, embedding_keywords FROM tn_topic WHERE id = %s", (topic_id,))
-        topic = cursor.fetchone()
-        
-        if not topic:
-            print(f"Topic {topic_id} not found.")
-            return
+        topics = fetch_topics(cursor, topic_ids)
+        missing = set(topic_ids) - {topic['id'] for topic in topics}
+        if missing:
+            print(f"Topics not found: {sorted(missing)}")
+        if not topics:
+            return 0
 
-        keywords = f"{topic['display_name']} {topic['embedding_keywords']}"
-        print(f"Topic Keywords: {keywords}")
-        
-        # 2. Generate Embedding for Topic
-        query_text = f"query: {keywords}"
-        query_embedding = get_embedding(model, query_text)
-        query_embedding_json = json.dumps(query_embedding)
-        
-        # 3. Search for Similar Articles
-        # We want to find articles from LEFT, RIGHT, and CENTER sides.
-        # Let's try to find top 10 for each side to have enough candidates.
-        
-        sides = ['LEFT', 'RIGHT', 'CENTER']
-        inserted_count = 0
-        
-        for side in sides:
-            print(f"Searching for {side} articles...")
-            
-            # TiDB Vector search query
-            # We use cosine distance. The closer to 0, the more similar.
-            # Added constraints:
-            # - published_at within last 7 days
-            # - similarity >= 0.7 (distance <= 0.3)
-            # - exclude articles already added to this topic
-            search_sql = """
-            SELECT id, source, source_domain, title, url, published_at, thumbnail_url, description,
-                   VEC_COSINE_DISTANCE(embedding, %s) as distance
-            FROM tn_home_article
-            WHERE side = %s 
-              AND embedding IS NOT NULL
-              AND published_at IS NOT NULL
-              AND published_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-              AND VEC_COSINE_DISTANCE(embedding, %s) <= 0.3
-              AND url NOT IN (SELECT url FROM tn_article WHERE topic_id = %s)
-            ORDER BY distance ASC
-            LIMIT 10
-            """
-            
-            cursor.execute(search_sql, (query_embedding_json, side, query_embedding_json, topic_id))
-            results = cursor.fetchall()
-            
-            print(f"Found {len(results)} candidates for {side}.")
-            
-            for row in results:
-                # Insert into tn_article (no need to check duplicates, already filtered in SQL)
-                insert_sql = """
-                INSERT INTO tn_article (topic_id, source, source_domain, side, title, url, published_at, thumbnail_url, rss_desc, status, similarity)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'suggested', %s)
-                """
-                # distance is 0 for identical, 1 for opposite. Similarity = 1 - distance (roughly)
-                similarity = 1 - row['distance']
-                
-                cursor.execute(insert_sql, (
-                    topic_id, row['source'], row['source_domain'], side, row['title'], 
-                    row['url'], row['published_at'], row['thumbnail_url'], row['description'], similarity
-                ))
-                inserted_count += 1
-        
+        # 2. Topic query embeddings ('query: ' prefix for E5 search keywords); only new or edited topics are encoded
+        texts = [f"query: {topic['display_name']} {topic['embedding_keywords']}" for topic in topics]
+        for topic, text in zip(topics, texts):
+            print(f"Topic {topic['id']} Keywords: {text[len('query: '):]}")
+        cached = load_query_embeddings(cursor, "db", {topic['id']: [text] for topic, text in zip(topics, texts)},
+                                       label="topic_matcher_db")
+        query_embeddings = np.stack([cached[topic['id']][0] for topic in topics])
+
+        # 3. Search for Similar Articles (top 10 per side, within 7 days, similarity >= 0.7, not yet in the topic)
+        ann_index = ArticleAnnIndex().load() if ANN_MATCHING != "off" else None
+        if ann_index is not None and len(ann_index) and (ANN_MATCHING == "on" or ann_index_is_complete(cursor, ann_index)):
+            print(f"Using local ANN index ({len(ann_index)} articles).")
+            candidates = find_candidates_ann(cursor, ann_index, topics, query_embeddings)
+        else:
+            candidates = find_candidates_sql(cursor, topics, query_embeddings)
+
+        for topic in topics:
+            per_side = {side: sum(1 for c in candidates if c['topic_id'] == topic['id'] and c['side'] == side) for side in SIDES}
+            print(f"Topic {topic['id']} candidates: " + ", ".join(f"{side} {count}" for side, count in per_side.items()))
+
+        # 4. Insert
+        inserted_count = insert_candidates(cursor, candidates)
         conn.commit()
         print(f"Successfully added {inserted_count} new suggested articles.")
+        return inserted_count
+
+def collect_articles_for_topic(conn, topic_id: int) -> int:
+    return collect_articles_for_topics(conn, [topic_id])
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python embedding_processor.py <topic_id>")
+        print("Usage: python topic_matcher_db.py <topic_id> [<topic_id> ...]")
         sys.exit(1)
     
-    topic_id = int(sys.argv[1])
+    topic_ids = [int(arg) for arg in sys.argv[1:]]
     
     conn = get_db_connection()
     try:
-        model = SentenceTransformer(MODEL_NAME)
         # Optional: Update embeddings for new articles first
-        # update_article_embeddings(conn, model) 
+        # update_article_embeddings(conn) 
         # (Disabled to save memory/time if we assume vector_indexer runs separately, 
         #  but if vector_indexer is restricted, we might need to embed candidates on the fly here too?
         #  Actually, embedding_processor.py relies on tn_home_article having embeddings.
@@ -164,6 +278,6 @@ if __name__ == "__main__":
         #  However, article_collector.py is the main one used for "recollect".
         #  Let's stick to just updating the model name here for safety.)
         
-        collect_articles_for_topic(conn, model, topic_id)
+        collect_articles_for_topics(conn, topic_ids)
     finally:
         conn.close()
@@ -5,6 +5,13 @@ article_collector_final.py
 - SOURCE CHANGED: Now reads from tn_home_article table instead of pulling RSS feeds directly.
 - This script analyzes a pool of recent articles (collected by home_article_collector.py)
   and suggests relevant ones for specific topics using an AI similarity model.
+- Incremental: each topic keeps a high-water mark (the DB time up to which tn_home_article.created_at
+  was scored) in topic_watermarks.json, so a run only scores articles that arrived since. Each run
+  re-reads WATERMARK_OVERLAP_SECONDS before the mark, so rows that committed late (a transaction open
+  across the previous run; TiDB ids are not in commit order, hence created_at rather than id) are not
+  skipped, and drops the ids already scored in that overlap. Topics that are new, whose keywords
+  (or the embedding model) changed, or all topics with --full are re-evaluated against the whole
+  TIME_WINDOW_HOURS window.
 """
 
 import os
@@ -15,22 +22,27 @@ load_dotenv(dotenv_path=dotenv_path)
 
 import sys
 import re
+import json
 import logging
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, replace
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import pymysql
 
+from embedding_utils import encode_texts
+from topic_query_cache import load_query_embeddings, source_hash
+
 # ---------------- Config ----------------
-MODEL_NAME = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-base")
 TIME_WINDOW_HOURS = int(os.getenv("TIME_WINDOW_HOURS", "24"))
 TARGET_PER_SIDE = int(os.getenv("TARGET_ARTICLES_PER_SIDE", "20"))
 SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.78"))
 GLOBAL_DEADLINE = int(os.getenv("COLLECT_DEADLINE", "900"))  # 15 min
+PICK_PER_SIDE = 10  # 토픽별로 진영(LEFT/RIGHT)마다 추가하는 최대 기사 수
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+WATERMARK_PATH = os.path.join(os.path.dirname(__file__), 'topic_watermarks.json')
+WATERMARK_OVERLAP_SECONDS = int(os.getenv("WATERMARK_OVERLAP_SECONDS", "600"))  # 늦게 커밋된 기사를 위한 재확인 구간
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -56,6 +68,8 @@ class Article:
     rss_desc: Optional[str]
     thumbnail_url: Optional[str]
     similarity: float = 0.0
+    id: Optional[int] = None  # tn_home_article.id
+    created_at: Optional[datetime] = None  # tn_home_article.created_at (DB 시간)
 
 # ------------- Utils ----------------
 LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), 'collector.log')
@@ -68,30 +82,28 @@ logging.basicConfig(
     ]
 )
 
-# SentenceTransformer cache
-_MODEL = None
-def get_model():
-    global _MODEL
-    if _MODEL is None:
-        logging.info(f"Loading AI similarity model: {MODEL_NAME}...")
-        _MODEL = SentenceTransformer(MODEL_NAME)
-        logging.info("Model loaded.")
-    return _MODEL
+def e5_inputs(texts: List[str], is_query: bool = False) -> List[str]:
+    prefix = "query: " if is_query else "passage: "
+    return [f"{prefix}{t[:512]}" for t in texts]
 
 def embed_texts(texts: List[str], is_query: bool = False) -> np.ndarray:
-    model = get_model()
-    prefix = "query: " if is_query else "passage: "
-    prefixed = [f"{prefix}{t[:512]}" for t in texts]
-    vecs = model.encode(prefixed, batch_size=128, normalize_embeddings=True)
-    return np.asarray(vecs, dtype=np.float32)
+    # 상주 임베딩 서비스(embedding_server.py)가 있으면 그쪽으로 요청하고, 없으면 프로세스 내에서 모델을 로드
+    return encode_texts(e5_inputs(texts, is_query), label="topic_matcher_local")
 
 # ------------- DB Helpers -----------------
-def get_articles_from_db(cursor) -> List[Article]:
+def get_articles_from_db(cursor, after: Optional[datetime] = None, upto: Optional[datetime] = None) -> List[Article]:
+    """TIME_WINDOW_HOURS 안에 발행된 기사 중 after < created_at <= upto 인 기사를 가져옵니다 (after가 없으면 전체)."""
     since = datetime.now(timezone.utc) - timedelta(hours=TIME_WINDOW_HOURS)
-    cursor.execute(
-        "SELECT * FROM tn_home_article WHERE published_at >= %s",
-        (since,)
-    )
+    sql = ("SELECT id, source, source_domain, side, title, url, published_at, description, thumbnail_url, created_at "
+           "FROM tn_home_article WHERE published_at >= %s")
+    params = [since]
+    if after is not None:
+        sql += " AND created_at > %s"
+        params.append(after)
+    if upto is not None:
+        sql += " AND (created_at <= %s OR created_at IS NULL)"
+        params.append(upto)
+    cursor.execute(sql, params)
     rows = cursor.fetchall()
     articles = []
     for row in rows:
@@ -103,11 +115,18 @@ def get_articles_from_db(cursor) -> List[Article]:
             url=row.get('url'),
             published_at=row.get('published_at'),
             rss_desc=row.get('description'), # Map 'description' to 'rss_desc'
-            thumbnail_url=row.get('thumbnail_url')
+            thumbnail_url=row.get('thumbnail_url'),
+            id=row.get('id'),
+            created_at=row.get('created_at'),
         ))
-    logging.info(f"Fetched {len(articles)} recent articles from tn_home_article table.")
+    logging.info(f"Fetched {len(articles)} recent articles (created after {after or 'window start'}) from tn_home_article table.")
     return articles
 
+def get_db_now(cursor) -> datetime:
+    """created_at과 같은 시계(DB 세션 시간)로 이번 실행의 상한을 정합니다."""
+    cursor.execute("SELECT NOW() AS now")
+    return cursor.fetchone()['now']
+
 def get_published_topics(cursor, target_topic_id: Optional[int] = None) -> List[Dict]:
     if target_topic_id:
         cursor.execute("SELECT * FROM tn_topic WHERE id=%s AND status='published' LIMIT 1", (target_topic_id,))
@@ -135,62 +154,127 @@ def insert_article(cursor, topic_id: int, a: Article):
 def update_collection_status(cursor, topic_id: int, status: str):
     cursor.execute("UPDATE tn_topic SET collection_status=%s, updated_at=NOW() WHERE id=%s", (status, topic_id))
 
+# ------------- Watermarks -----------------
+def load_watermarks() -> Dict[str, Dict]:
+    """토픽 id(문자열) -> {scored_until, overlap_ids, keywords_hash}. 파일이 없으면 모든 토픽을 전체 평가합니다."""
+    try:
+        with open(WATERMARK_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable {WATERMARK_PATH}: {e}")
+        return {}
+
+def save_watermarks(watermarks: Dict[str, Dict]) -> None:
+    tmp_path = f"{WATERMARK_PATH}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(watermarks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, WATERMARK_PATH)
+    except OSError as e:
+        logging.warning(f"Failed to save {WATERMARK_PATH}: {e}")
+
+def keywords_hash(topic: Dict) -> str:
+    """키워드나 임베딩 모델(백엔드 포함)이 바뀌면 달라지는 해시. 달라진 토픽은 전체 기간을 다시 평가합니다."""
+    return source_hash(e5_inputs(topic_keywords(topic), is_query=True))
+
+def topic_watermark(watermarks: Dict[str, Dict], topic: Dict) -> Optional[Tuple[datetime, set]]:
+    """
+    (이 토픽을 평가한 created_at 상한, 그 직전 overlap 구간에서 이미 평가한 기사 id).
+    처음이거나 키워드가 바뀌었으면 None (전체 평가).
+    """
+    entry = watermarks.get(str(topic["id"]))
+    if not entry or entry.get("keywords_hash") != keywords_hash(topic) or "scored_until" not in entry:
+        return None
+    return datetime.fromisoformat(entry["scored_until"]), set(entry.get("overlap_ids", []))
+
+def unseen_mask(articles: List[Article], mark: Optional[Tuple[datetime, set]]) -> np.ndarray:
+    """mark 이후(overlap 포함)에 들어왔고 아직 이 토픽에 대해 평가하지 않은 기사."""
+    if mark is None:
+        return np.ones(len(articles), dtype=bool)
+    scored_until, overlap_ids = mark
+    after = scored_until - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+    return np.array([a.created_at is not None and a.created_at > after and a.id not in overlap_ids for a in articles],
+                    dtype=bool)
+
+# ------------- Scoring -----------------
+def topic_keywords(topic: Dict) -> List[str]:
+    raw_kw = (topic.get("search_keywords") or topic.get("core_keyword") or "").strip()
+    return [s.strip() for s in raw_kw.split(",") if s.strip()]
+
+def build_topic_queries(topics: List[Dict]) -> Tuple[List[Dict], List[str], np.ndarray]:
+    """
+    모든 토픽의 키워드를 하나의 목록으로 합칩니다.
+    반환: (키워드가 있는 토픽, 키워드 목록, 토픽별 키워드 시작 위치)
+    """
+    scored_topics, keywords, offsets = [], [], []
+    for topic in topics:
+        kws = topic_keywords(topic)
+        if not kws:
+            logging.warning(f"  ↳ Topic #{topic.get('id')} has no search_keywords; skip")
+            continue
+        scored_topics.append(topic)
+        offsets.append(len(keywords))
+        keywords.extend(kws)
+    return scored_topics, keywords, np.asarray(offsets, dtype=np.intp)
+
+def score_topics(passage_vecs: np.ndarray, query_vecs: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    기사 x 키워드 유사도를 한 번의 행렬곱으로 계산한 뒤, 토픽별 키워드 열에서 최댓값을 취합니다.
+    반환: (기사 수, 토픽 수) 유사도 행렬
+    """
+    sims = passage_vecs @ query_vecs.T
+    # 각 토픽의 키워드는 연속된 열이므로 reduceat으로 토픽 단위 max를 한 번에 계산
+    return np.maximum.reduceat(sims, offsets, axis=1)
+
+def top_indices(scores: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """mask에 해당하는 기사 중 점수 상위 k개의 인덱스를 점수 내림차순으로 반환합니다."""
+    idx = np.flatnonzero(mask)
+    if len(idx) > k:
+        idx = idx[np.argpartition(-scores[idx], k - 1)[:k]]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
 # ------------- Main -----------------
-def collect_for_topic(cnx, topic: Dict, articles: List[Article]):
+def collect_for_topic(cnx, topic: Dict, articles: List[Article], scores: np.ndarray, sides: np.ndarray,
+                      unseen: Optional[np.ndarray] = None):
+    """
+    scores: 이 토픽에 대한 기사별 유사도 (score_topics 결과의 한 열)
+    unseen: 이 토픽의 watermark 이후에 들어온 기사 mask (None이면 전체)
+    """
     topic_id = int(topic["id"])
     display_name = topic.get("display_name") or topic.get("core_keyword")
     logging.info(f"▶ Analyzing articles for topic #{topic_id} '{display_name}'")
 
-    raw_kw = (topic.get("search_keywords") or topic.get("core_keyword") or "").strip()
-    if not raw_kw:
-        logging.warning("  ↳ No search_keywords; skip")
-        return
-
-    initial_keywords = [s.strip() for s in raw_kw.split(",") if s.strip()]
-
-    # Embeddings
-    passage_texts = [f"{a.title} {a.rss_desc or ''}" for a in articles]
-    passage_vecs = embed_texts(passage_texts, is_query=False)
-    query_vecs = embed_texts(initial_keywords, is_query=True)
+    eligible = scores >= SIMILARITY_THRESHOLD
+    if unseen is not None:
+        eligible &= unseen
+    logging.info(f"  ↳ Found {int(eligible.sum())} candidates with similarity >= {SIMILARITY_THRESHOLD}")
 
-    sims = (passage_vecs @ query_vecs.T)
-    max_sim = sims.max(axis=1)
-
-    candidates: List[Article] = []
-    for i, a in enumerate(articles):
-        a.similarity = float(max_sim[i])
-        if a.similarity >= SIMILARITY_THRESHOLD:
-            candidates.append(a)
-    
-    logging.info(f"  ↳ Found {len(candidates)} candidates with similarity >= {SIMILARITY_THRESHOLD}")
-
-    if not candidates:
+    if not eligible.any():
       return
 
     # Filter out existing articles
     cursor = cnx.cursor(pymysql.cursors.DictCursor)
     update_collection_status(cursor, topic_id, "collecting")
     existing_urls = get_existing_urls_for_topic(cursor, topic_id)
-    candidates = [a for a in candidates if a.url not in existing_urls]
-    logging.info(f"  ↳ {len(candidates)} candidates remain after filtering existing URLs.")
 
-    if not candidates:
+    # Rank by similarity and pick the top PICK_PER_SIDE for each side.
+    # 이미 추가된 기사가 상위권에 섞여 있어도 충분히 남도록 기존 URL 수만큼 여유를 두고 뽑음
+    picked: Dict[str, List[Article]] = {}
+    for side in ("LEFT", "RIGHT"):
+        ranked = top_indices(scores, eligible & (sides == side), PICK_PER_SIDE + len(existing_urls))
+        picked[side] = [
+            replace(articles[i], similarity=float(scores[i]))
+            for i in ranked if articles[i].url not in existing_urls
+        ][:PICK_PER_SIDE]
+    left_to_add, right_to_add = picked["LEFT"], picked["RIGHT"]
+
+    if not left_to_add and not right_to_add:
+      logging.info("  ↳ 0 candidates remain after filtering existing URLs.")
       update_collection_status(cursor, topic_id, "completed")
       return
 
-    # Rank by similarity and pick the top 10 for each side
-    candidates.sort(key=lambda x: x.similarity, reverse=True)
-    
-    left_to_add, right_to_add = [], []
-    for a in candidates:
-        if a.side == "LEFT" and len(left_to_add) < 10:
-            left_to_add.append(a)
-        elif a.side == "RIGHT" and len(right_to_add) < 10:
-            right_to_add.append(a)
-        # Stop if both sides are full
-        if len(left_to_add) >= 10 and len(right_to_add) >= 10:
-            break
-
     # Insert the selected articles
     articles_to_add = left_to_add + right_to_add
     for article_to_add in articles_to_add:
@@ -201,7 +285,9 @@ def collect_for_topic(cnx, topic: Dict, articles: List[Article]):
 
 def main():
     logging.info("--- Article Analyzer ---")
-    target_topic_id = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else None
+    args = sys.argv[1:]
+    target_topic_id = next((int(arg) for arg in args if arg.isdigit()), None)
+    full_rescan = '--full' in args
 
     cnx = None
     try:
@@ -213,22 +299,60 @@ def main():
         if not topics:
             logging.warning("No published topics to analyze.")
             return
-        
-        # Fetch candidate articles from DB ONCE
-        candidate_articles = get_articles_from_db(cursor)
-        if not candidate_articles:
-            logging.warning("No recent articles in tn_home_article to analyze.")
+
+        scored_topics, keywords, offsets = build_topic_queries(topics)
+        if not scored_topics:
+            logging.warning("No topics with search keywords to analyze.")
             return
 
-        for t in topics:
+        # 토픽별 watermark 이후의 기사만 평가. 이번 실행 중에 들어오는 기사는 다음 실행에서 처리되도록 상한을 고정
+        watermarks = load_watermarks()
+        upto = get_db_now(cursor)
+        marks = [None if full_rescan else topic_watermark(watermarks, t) for t in scored_topics]
+        full_count = sum(mark is None for mark in marks)
+        logging.info(f"{full_count} topics evaluated over the full window, {len(scored_topics) - full_count} incrementally "
+                     f"(articles created up to {upto}).")
+
+        # Fetch candidate articles from DB ONCE (가장 오래된 watermark - overlap 이후만)
+        after = None
+        if full_count == 0:
+            after = min(scored_until for scored_until, _ in marks) - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+        candidate_articles = get_articles_from_db(cursor, after=after, upto=upto)
+        # 다음 실행의 overlap 구간에 다시 읽힐 기사: 이번 실행에서 모든 토픽에 대해 평가되므로 다음에는 건너뜀
+        overlap_from = upto - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+        overlap_ids = sorted(a.id for a in candidate_articles if a.created_at is not None and a.created_at > overlap_from)
+        topic_scores = None
+        if candidate_articles:
+            # 기사 풀과 모든 토픽의 키워드를 각각 한 번만 인코딩하고, 유사도는 한 번의 행렬곱으로 계산
+            passage_vecs = embed_texts([f"{a.title} {a.rss_desc or ''}" for a in candidate_articles], is_query=False)
+            # 토픽 키워드 벡터는 tn_topic_query_embedding에 저장된 것을 쓰고, 새로 생겼거나 바뀐 토픽만 인코딩
+            cached = load_query_embeddings(cursor, "local", {t["id"]: e5_inputs(topic_keywords(t), is_query=True) for t in scored_topics},
+                                           label="topic_matcher_local")
+            query_vecs = np.concatenate([cached[t["id"]] for t in scored_topics])
+            topic_scores = score_topics(passage_vecs, query_vecs, offsets)
+            sides = np.array([a.side for a in candidate_articles])
+            logging.info(f"Scored {len(candidate_articles)} articles against {len(scored_topics)} topics ({len(keywords)} keywords).")
+        else:
+            logging.info("No new articles in tn_home_article since the last run.")
+
+        if target_topic_id is None:
+            # 더 이상 published가 아닌 토픽의 watermark는 정리 (다시 게시되면 전체 평가)
+            published_ids = {str(t["id"]) for t in scored_topics}
+            watermarks = {k: v for k, v in watermarks.items() if k in published_ids}
+        for column, t in enumerate(scored_topics):
             try:
-                collect_for_topic(cnx, t, candidate_articles)
+                if topic_scores is not None:
+                    collect_for_topic(cnx, t, candidate_articles, topic_scores[:, column], sides,
+                                      unseen_mask(candidate_articles, marks[column]))
+                watermarks[str(t["id"])] = {"scored_until": upto.isoformat(), "overlap_ids": overlap_ids,
+                                            "keywords_hash": keywords_hash(t)}
             except Exception as e:
                 logging.exception(f"Topic #{t.get('id')} failed: {e}")
                 try:
                     update_collection_status(cursor, int(t.get('id')), "failed")
                 except Exception:
                     pass
+        save_watermarks(watermarks)
 
     finally:
         if cnx:
@@ -236,4 +360,4 @@ def main():
         logging.info("All done.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+topic_query_cache.py
+- Topic query embeddings persisted in tn_topic_query_embedding (db/migrations/003_topic_query_embedding.sql),
+  shared by topic_matcher_db.py and topic_matcher_local.py.
+- Each row holds the vectors one matcher encoded for a topic together with a hash of the embedding model
+  and the exact query texts. A row whose hash no longer matches (display_name or keywords edited, model
+  changed) is re-encoded and overwritten, so matching runs only call the model for new or edited topics.
+- Without the table (migration not applied) the query texts are simply encoded on every run.
+"""
+
+import json
+import hashlib
+import logging
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pymysql
+
+from embedding_utils import encode_texts, model_key
+
+ER_NO_SUCH_TABLE = 1146
+UPSERT_SQL = (
+    "INSERT INTO tn_topic_query_embedding (topic_id, matcher, source_hash, embeddings) VALUES (%s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE source_hash = VALUES(source_hash), embeddings = VALUES(embeddings)"
+)
+
+
+def source_hash(texts: Sequence[str]) -> str:
+    """임베딩 모델과 인코딩할 텍스트가 같으면 같은 값 (blake2b-128)."""
+    return hashlib.blake2b("\n".join([model_key(), *texts]).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_query_embeddings(cursor, matcher: str, topic_texts: Dict[int, List[str]], label: str) -> Dict[int, np.ndarray]:
+    """
+    topic_texts: 토픽 id -> 인코딩할 쿼리 텍스트 목록 ('query: ' prefix 포함, 모델 입력 그대로)
+    반환: 토픽 id -> (텍스트 수, dim) 벡터. 저장된 hash가 다른 토픽만 한 번에 인코딩해 저장합니다.
+    cursor는 DictCursor여야 하며, 저장한 행은 호출한 쪽의 commit(또는 autocommit)으로 반영됩니다.
+    """
+    if not topic_texts:
+        return {}
+    hashes = {topic_id: source_hash(texts) for topic_id, texts in topic_texts.items()}
+    vectors: Dict[int, np.ndarray] = {}
+    table_exists = True
+    placeholders = ",".join(["%s"] * len(topic_texts))
+    try:
+        cursor.execute(
+            f"SELECT topic_id, source_hash, embeddings FROM tn_topic_query_embedding "
+            f"WHERE matcher = %s AND topic_id IN ({placeholders})",
+            [matcher, *topic_texts],
+        )
+        for row in cursor.fetchall():
+            if row['source_hash'] == hashes.get(row['topic_id']):
+                vectors[row['topic_id']] = np.asarray(json.loads(row['embeddings']), dtype=np.float32)
+    except pymysql.err.ProgrammingError as e:
+        if e.args[0] != ER_NO_SUCH_TABLE:
+            raise
+        logging.warning("tn_topic_query_embedding is missing (apply db/migrations/003_topic_query_embedding.sql); "
+                        "encoding topic queries without the cache.")
+        table_exists = False
+
+    stale = [topic_id for topic_id in topic_texts if topic_id not in vectors]
+    if stale:
+        vecs = encode_texts([text for topic_id in stale for text in topic_texts[topic_id]], label=label)
+        rows, offset = [], 0
+        for topic_id in stale:
+            count = len(topic_texts[topic_id])
+            vectors[topic_id] = vecs[offset:offset + count]
+            offset += count
+            rows.append((topic_id, matcher, hashes[topic_id], json.dumps(vectors[topic_id].tolist())))
+        if table_exists:
+            cursor.executemany(UPSERT_SQL, rows)
+    logging.info(f"[{label}] Topic query embeddings: {len(topic_texts) - len(stale)}/{len(topic_texts)} topics cached, "
+                 f"{len(stale)} encoded.")
+    return vectors
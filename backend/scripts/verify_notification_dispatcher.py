@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+verify_notification_dispatcher.py
+- Runs NotificationDispatcher against a local stub of /api/internal/send-notifications.
+- The stub checks the x-internal-secret header, records every batch and fails the first
+  request with 503 so the retry path is exercised.
+"""
+
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from notification_dispatcher import NotificationDispatcher
+
+SECRET = "stub-secret"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    batches = []
+    failures_left = 1
+
+    def do_POST(self):
+        if self.path != "/api/internal/send-notifications":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("x-internal-secret") != SECRET:
+            self.send_response(403)
+            self.end_headers()
+            return
+        if StubHandler.failures_left > 0:
+            StubHandler.failures_left -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        StubHandler.batches.append(body["notifications"])
+        self.send_response(202)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps({"count": len(body["notifications"])}).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def verify():
+    server = HTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/internal/send-notifications"
+    print(f"Stub listening on {url}")
+
+    dispatcher = NotificationDispatcher(url=url, secret=SECRET, batch_size=3, flush_interval=0.2).start()
+    now = datetime.now(timezone.utc)
+    for i in range(7):
+        notification_type = 'BREAKING_NEWS' if i % 2 == 0 else 'EXCLUSIVE_NEWS'
+        dispatcher.enqueue(notification_type, {
+            'title': f"[속보] 테스트 기사 {i}",
+            'url': f"https://example.com/news/{i}",
+            'source': '연합뉴스',
+            'source_domain': 'yna.co.kr',
+            'thumbnail_url': None,
+            'published_at': now,
+        })
+    dispatcher.close(timeout=10)
+    server.shutdown()
+
+    received = sum(len(batch) for batch in StubHandler.batches)
+    print(f"Batches received: {[len(batch) for batch in StubHandler.batches]}")
+    print(f"Sent: {dispatcher.sent}, Dropped: {dispatcher.dropped}")
+    if received == 7 and dispatcher.sent == 7 and all(len(batch) <= 3 for batch in StubHandler.batches):
+        print("SUCCESS: All notifications delivered in batches.")
+    else:
+        print("FAILURE: Notifications were not delivered as expected.")
+
+
+if __name__ == "__main__":
+    verify()
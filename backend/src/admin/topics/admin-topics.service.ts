@@ -224,12 +224,12 @@ export class AdminTopicsService {
     if (!enableAiCollection) {
       return {
         message:
-          'AI 수집 기능이 비활성화되어 있습니다. 로컬에서 vector_indexer.py를 실행하세요.',
-        command: `python scripts/vector_indexer.py --topic_id ${topicId}`,
+          'AI 수집 기능이 비활성화되어 있습니다. 로컬에서 topic_matcher_db.py를 실행하세요.',
+        command: `python scripts/topic_matcher_db.py ${topicId}`,
       };
     }
 
-    this.runPythonScript('vector_indexer.py', ['--topic_id', String(topicId)]);
+    this.runPythonScript('topic_matcher_db.py', [String(topicId)]);
     return { message: 'AI 기반 기사 수집이 시작되었습니다.' };
   }
 
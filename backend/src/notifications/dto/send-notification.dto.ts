@@ -1,5 +1,14 @@
 import { ApiProperty } from '@nestjs/swagger';
-import { IsEnum, IsNotEmpty, IsObject } from 'class-validator';
+import { Type } from 'class-transformer';
+import {
+  ArrayMaxSize,
+  ArrayNotEmpty,
+  IsArray,
+  IsEnum,
+  IsNotEmpty,
+  IsObject,
+  ValidateNested,
+} from 'class-validator';
 
 export enum NotificationType {
   NEW_TOPIC = 'NEW_TOPIC',
@@ -31,3 +40,16 @@ export class SendNotificationDto {
   @IsNotEmpty()
   data: Record<string, any>;
 }
+
+export class SendNotificationBatchDto {
+  @ApiProperty({
+    description: '한 번에 발송할 알림 목록',
+    type: [SendNotificationDto],
+  })
+  @IsArray()
+  @ArrayNotEmpty()
+  @ArrayMaxSize(100)
+  @ValidateNested({ each: true })
+  @Type(() => SendNotificationDto)
+  notifications: SendNotificationDto[];
+}
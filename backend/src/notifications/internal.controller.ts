@@ -2,6 +2,7 @@ import {
   Body,
   Controller,
   ForbiddenException,
+  Logger,
   Post,
   Req,
 } from '@nestjs/common';
@@ -14,12 +15,17 @@ import {
   ApiTags,
 } from '@nestjs/swagger';
 import type { Request } from 'express';
-import { SendNotificationDto } from './dto/send-notification.dto';
+import {
+  SendNotificationBatchDto,
+  SendNotificationDto,
+} from './dto/send-notification.dto';
 import { NotificationsService } from './notifications.service';
 
 @ApiTags('Internal')
 @Controller('api/internal')
 export class InternalController {
+  private readonly logger = new Logger(InternalController.name);
+
   constructor(
     private readonly notificationsService: NotificationsService,
     private readonly configService: ConfigService,
@@ -44,15 +50,7 @@ export class InternalController {
     @Req() req: Request,
     @Body() sendNotificationDto: SendNotificationDto,
   ) {
-    // Security Check
-    const internalSecret = this.configService.get<string>(
-      'INTERNAL_API_SECRET',
-    );
-    const requestSecret = req.headers['x-internal-secret'];
-
-    if (!internalSecret || requestSecret !== internalSecret) {
-      throw new ForbiddenException('Invalid or missing internal secret');
-    }
+    this.assertInternalSecret(req);
 
     // Fire-and-forget: Respond immediately
     // The actual sending logic is awaited but happens "in the background" from the client's perspective
@@ -63,4 +61,60 @@ export class InternalController {
 
     return { message: 'Notification dispatch initiated.' };
   }
+
+  @Post('send-notifications')
+  @ApiOperation({
+    summary: '(내부용) 실시간 알림 일괄 발송',
+    description:
+      "여러 알림을 한 번의 요청으로 발송합니다. Python 수집기의 알림 디스패처가 속보/단독 기사를 모아서 호출합니다. 헤더에 'x-internal-secret'으로 내부용 시크릿 키를 포함해야 합니다.",
+  })
+  @ApiHeader({
+    name: 'x-internal-secret',
+    required: true,
+    description: '내부 API 호출을 위한 시크릿 키',
+  })
+  @ApiBody({ type: SendNotificationBatchDto })
+  @ApiResponse({ status: 202, description: '알림 발송 작업이 시작됨' })
+  @ApiResponse({ status: 400, description: '잘못된 요청 데이터' })
+  @ApiResponse({ status: 403, description: '인증 실패' })
+  async sendNotifications(
+    @Req() req: Request,
+    @Body() batchDto: SendNotificationBatchDto,
+  ) {
+    this.assertInternalSecret(req);
+
+    // Fire-and-forget: 순서대로 발송하되 응답은 즉시 반환
+    // 백그라운드 작업이므로 실패는 알림별로 기록하고 나머지 발송을 계속함 (unhandled rejection 방지)
+    void (async () => {
+      for (const notification of batchDto.notifications) {
+        try {
+          await this.notificationsService.sendNotificationToAll(
+            notification.notification_type,
+            notification.data,
+          );
+        } catch (error) {
+          this.logger.error(
+            `Failed to send notification of type ${notification.notification_type}:`,
+            error,
+          );
+        }
+      }
+    })();
+
+    return {
+      message: 'Notification dispatch initiated.',
+      count: batchDto.notifications.length,
+    };
+  }
+
+  private assertInternalSecret(req: Request) {
+    const internalSecret = this.configService.get<string>(
+      'INTERNAL_API_SECRET',
+    );
+    const requestSecret = req.headers['x-internal-secret'];
+
+    if (!internalSecret || requestSecret !== internalSecret) {
+      throw new ForbiddenException('Invalid or missing internal secret');
+    }
+  }
 }
@@ -98,6 +98,7 @@ CREATE TABLE `tn_home_article`  (
   `side` varchar(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NULL DEFAULT NULL,
   `title` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
   `url` varchar(2048) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+  `url_hash` binary(32) NOT NULL COMMENT 'UNHEX(SHA2(url, 256))',
   `published_at` datetime NULL DEFAULT NULL,
   `view_count` int(11) NOT NULL DEFAULT 0,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
@@ -105,8 +106,12 @@ CREATE TABLE `tn_home_article`  (
   `thumbnail_url` varchar(2048) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NULL DEFAULT NULL,
   `description` text CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NULL,
   `embedding` vector NULL,
+  `embed_lease_owner` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NULL DEFAULT NULL COMMENT '임베딩 작업을 임대한 워커 (host:pid:claim)',
+  `embed_lease_until` datetime NULL DEFAULT NULL COMMENT '임대 만료 시각 (UTC)',
   PRIMARY KEY (`id`) USING BTREE,
-  UNIQUE INDEX `url`(`url`(255) ASC) USING BTREE
+  UNIQUE INDEX `url_hash`(`url_hash` ASC) USING BTREE,
+  INDEX `url`(`url`(255) ASC) USING BTREE,
+  INDEX `embed_lease_owner`(`embed_lease_owner` ASC) USING BTREE
 ) ENGINE = InnoDB AUTO_INCREMENT = 17640001 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_bin COMMENT = '홈 화면 노출용 기사' ROW_FORMAT = Compact;
 
 -- ----------------------------
@@ -247,6 +252,20 @@ CREATE TABLE `tn_topic_comment_report_log`  (
   CONSTRAINT `fk_topic_report_log_to_comment` FOREIGN KEY (`comment_id`) REFERENCES `tn_topic_comment` (`id`) ON DELETE CASCADE ON UPDATE RESTRICT
 ) ENGINE = InnoDB AUTO_INCREMENT = 1 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_bin COMMENT = '사용자의 토픽 댓글 신고 기록' ROW_FORMAT = Compact;
 
+-- ----------------------------
+-- Table structure for tn_topic_query_embedding
+-- ----------------------------
+DROP TABLE IF EXISTS `tn_topic_query_embedding`;
+CREATE TABLE `tn_topic_query_embedding`  (
+  `topic_id` int(11) NOT NULL,
+  `matcher` varchar(16) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL COMMENT '임베딩을 만든 매처 (db | local)',
+  `source_hash` char(32) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT 'blake2b-128(모델명 + 인코딩한 텍스트)',
+  `embeddings` json NOT NULL COMMENT '쿼리 텍스트별 정규화된 벡터 목록',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`topic_id`, `matcher`) USING BTREE,
+  CONSTRAINT `fk_query_embedding_topic` FOREIGN KEY (`topic_id`) REFERENCES `tn_topic` (`id`) ON DELETE CASCADE ON UPDATE RESTRICT
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_bin COMMENT = '토픽 검색 쿼리 임베딩 캐시' ROW_FORMAT = Compact;
+
 -- ----------------------------
 -- Table structure for tn_topic_view_log
 -- ----------------------------
@@ -0,0 +1,13 @@
+-- ----------------------------
+-- tn_home_article: url(255) 접두사 UNIQUE 인덱스를 고정 길이 URL 해시 UNIQUE 인덱스로 교체
+-- rss_collector.py는 url_hash(UNHEX(SHA2(url, 256)))로 배치 단위 중복 체크 및 INSERT IGNORE를 수행합니다.
+-- ----------------------------
+
+ALTER TABLE `tn_home_article` ADD COLUMN `url_hash` binary(32) NULL COMMENT 'UNHEX(SHA2(url, 256))' AFTER `url`;
+
+UPDATE `tn_home_article` SET `url_hash` = UNHEX(SHA2(`url`, 256)) WHERE `url_hash` IS NULL;
+
+ALTER TABLE `tn_home_article` MODIFY COLUMN `url_hash` binary(32) NOT NULL COMMENT 'UNHEX(SHA2(url, 256))';
+ALTER TABLE `tn_home_article` DROP INDEX `url`;
+ALTER TABLE `tn_home_article` ADD UNIQUE INDEX `url_hash`(`url_hash` ASC);
+ALTER TABLE `tn_home_article` ADD INDEX `url`(`url`(255) ASC);
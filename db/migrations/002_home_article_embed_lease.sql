@@ -0,0 +1,9 @@
+-- ----------------------------
+-- tn_home_article: 임베딩 작업 임대(lease) 컬럼 추가
+-- daily_vectorizer.py --lease 워커들은 embedding IS NULL 행을 청크 단위로 embed_lease_owner에 기록해 나눠 가지며,
+-- embed_lease_until(UTC)이 지나면 다른 워커가 다시 가져갈 수 있습니다. embedding이 채워진 행에서는 의미가 없습니다.
+-- ----------------------------
+
+ALTER TABLE `tn_home_article` ADD COLUMN `embed_lease_owner` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NULL DEFAULT NULL COMMENT '임베딩 작업을 임대한 워커 (host:pid:claim)' AFTER `embedding`;
+ALTER TABLE `tn_home_article` ADD COLUMN `embed_lease_until` datetime NULL DEFAULT NULL COMMENT '임대 만료 시각 (UTC)' AFTER `embed_lease_owner`;
+ALTER TABLE `tn_home_article` ADD INDEX `embed_lease_owner`(`embed_lease_owner` ASC);
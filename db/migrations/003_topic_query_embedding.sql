@@ -0,0 +1,16 @@
+-- ----------------------------
+-- tn_topic_query_embedding: 토픽 검색 쿼리 임베딩 캐시
+-- 토픽 매칭 스크립트(topic_matcher_db.py, topic_matcher_local.py)가 토픽 키워드를 임베딩한 결과를 매처별로 저장합니다.
+-- source_hash(임베딩 모델 + 인코딩한 텍스트)가 현재 토픽 내용과 다르면 스크립트가 다시 임베딩해 덮어쓰므로,
+-- display_name/키워드가 바뀌면 자동으로 무효화되고 토픽을 삭제하면 함께 삭제됩니다.
+-- ----------------------------
+
+CREATE TABLE `tn_topic_query_embedding`  (
+  `topic_id` int(11) NOT NULL,
+  `matcher` varchar(16) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL COMMENT '임베딩을 만든 매처 (db | local)',
+  `source_hash` char(32) CHARACTER SET ascii COLLATE ascii_bin NOT NULL COMMENT 'blake2b-128(모델명 + 인코딩한 텍스트)',
+  `embeddings` json NOT NULL COMMENT '쿼리 텍스트별 정규화된 벡터 목록',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`topic_id`, `matcher`) USING BTREE,
+  CONSTRAINT `fk_query_embedding_topic` FOREIGN KEY (`topic_id`) REFERENCES `tn_topic` (`id`) ON DELETE CASCADE ON UPDATE RESTRICT
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_bin COMMENT = '토픽 검색 쿼리 임베딩 캐시' ROW_FORMAT = Compact;